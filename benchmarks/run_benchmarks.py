@@ -0,0 +1,287 @@
+"""
+Time and memory-profile the public functions in metrics/ on synthetic extracts.
+
+    python -m benchmarks.run_benchmarks --rows 100000 --output baseline.json
+    python -m benchmarks.run_benchmarks --rows 100000 --baseline baseline.json
+
+With --baseline, functions that got slower or use more memory than the baseline
+by more than --tolerance are flagged and the exit status is 1.
+"""
+import argparse
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from metrics import aggregatestore, annotations, columnar, cube, convert_percentage_to_scale, datacollectorscore, dataquality, dataquality_data
+from metrics import feature_calculations, fieldcounts, loader, multiutility, nullprofile, overallscore, parallel, preview, ruleplan, sqlscoring, streaming, synthetic, uniqueness
+
+def benchmark_cases(rows, utility, seed, workdir):
+    """
+    Fixtures built once, and a dict of benchmark name -> callable taking no arguments.
+    """
+    formats = synthetic.UTILITIES[utility]
+    params = (formats['slrn_prefix'], formats['slrn_length'], formats['meter_prefix'], formats['meter_length'])
+    key_fields = dataquality.KEY_FIELDS
+
+    extract_path = os.path.join(workdir, 'extract.csv')
+    synthetic.write_extract(extract_path, rows, utility, seed)
+    raw = synthetic.make_extract(rows, utility, seed)
+    df = loader.prepare_extract(raw)
+    compact = loader.compact_extract(df)
+    # The same records with every value repeated about 100 times, as in extracts that memoization pays off on
+    repetitive = df.iloc[np.arange(len(df)) % max(len(df) // 100, 1)].reset_index(drop=True)
+
+    counts = fieldcounts.calculate_field_counts(df, key_fields, streaming.PARTITION_COLUMNS, *params, dropna=False)
+    month_counts = fieldcounts.merge_field_counts([counts], ['Year Month'])
+    collector_counts = fieldcounts.merge_field_counts([counts], ['First Captured Username'])
+    blank_counts = feature_calculations.calculate_blank_counts(df)
+    unique_meter_count = df.groupby('Year Month')['Meter Number'].nunique()
+    metrics_list = [dataquality.calculate_data_quality_metrics(df, field_name, *params) for field_name in key_fields]
+    meter_numbers = df['Meter Number'].dropna()
+    phone_numbers = df['Phone Number'].dropna()
+    emails = df['Email'].dropna()
+    percentages = pd.Series(np.linspace(0, 100, rows))
+    cache_paths = columnar.convert_extracts([extract_path], os.path.join(workdir, 'columnar'))
+    quality_cube = cube.QualityCube(df, plan=ruleplan.rule_plan(utility))
+    null_profile = nullprofile.NullProfile(df)
+    uniqueness_fields = [field_name for field_name in dataquality.UNIQUENESS_FIELDS if field_name in df.columns]
+    uniqueness_index = uniqueness.UniquenessIndex()
+    uniqueness_index.add(df, 'month')
+    identifier_hashes = {field_name: dataquality.hash_identifiers(dataquality.RuleMaskCache(df).processed(field_name)) for field_name in uniqueness_fields}
+
+    def each_field(function, *args, **kwargs):
+        return lambda: [function(df, field_name, *args, **kwargs) for field_name in key_fields]
+
+    def fresh_dir(name):
+        return tempfile.mkdtemp(prefix=name, dir=workdir)
+
+    def all_masks():
+        cache = dataquality.RuleMaskCache(df)
+        for field_name in key_fields:
+            cache.validity(field_name, *params)
+            cache.integrity(field_name, params[0], 'Meter Number')
+
+    def memoized_masks(frame, memo):
+        # Two frames validated through the same memo (or none, for the unmemoized path)
+        for _ in range(2):
+            cache = dataquality.RuleMaskCache(frame, memo)
+            for field_name in dataquality.MEMOIZED_FIELDS:
+                cache.validity(field_name, *params)
+
+    def sql_scorer():
+        scorer = sqlscoring.SqlScorer(os.path.join(fresh_dir('sql'), 'extract.db'), ruleplan.rule_plan(utility))
+        scorer.load([extract_path], chunksize=max(rows // 4, 1))
+        scorer.metrics_by_month()
+        scorer.close()
+
+    def aggregate_store():
+        store = aggregatestore.AggregateStore(os.path.join(fresh_dir('store'), 'aggregates.db'), *params)
+        store.refresh([extract_path])
+        store.metrics_by_month(key_fields)
+        store.close()
+
+    cases = {
+        'dataquality.calculate_data_quality_metrics': each_field(dataquality.calculate_data_quality_metrics, *params),
+        'dataquality.calculate_validity': each_field(dataquality.calculate_validity, *params),
+        'dataquality.calculate_integrity': each_field(dataquality.calculate_integrity, params[0], 'Meter Number'),
+        'dataquality.RuleMaskCache': all_masks,
+        'dataquality.ValidationMemo': lambda: memoized_masks(repetitive, dataquality.ValidationMemo()),
+        'dataquality.ValidationMemo.unmemoized': lambda: memoized_masks(repetitive, None),
+        'dataquality.ValidationMemo.distinct': lambda: memoized_masks(df, dataquality.ValidationMemo()),
+        'dataquality.ValidationMemo.distinct.unmemoized': lambda: memoized_masks(df, None),
+        'dataquality.uniqueness_mask': lambda: [dataquality.uniqueness_mask(df, field_name) for field_name in uniqueness_fields],
+        'dataquality.calculate_uniqueness': lambda: [dataquality.calculate_uniqueness(df, field_name) for field_name in uniqueness_fields],
+        'dataquality.hash_identifiers': lambda: dataquality.hash_identifiers(meter_numbers),
+        'dataquality.re2_pattern': lambda: [dataquality.re2_pattern(pattern) for pattern in [dataquality.VALID_PHONE_NUMBER_PATTERN, dataquality.EMAIL_PATTERN] * 1000],
+        'dataquality.validity_mask': each_field(dataquality.validity_mask, *params),
+        'dataquality.integrity_mask': each_field(dataquality.integrity_mask, params[0], 'Meter Number'),
+        'dataquality.preprocess_meter_number': lambda: meter_numbers.map(dataquality.preprocess_meter_number),
+        'dataquality.is_valid_meter_number': lambda: meter_numbers.astype(str).map(dataquality.is_valid_meter_number),
+        'dataquality.preprocess_phone_number': lambda: phone_numbers.map(dataquality.preprocess_phone_number),
+        'dataquality.is_valid_phone_number': lambda: phone_numbers.map(dataquality.is_valid_phone_number),
+        'dataquality.pn_has_integrity': lambda: [dataquality.pn_has_integrity(*values) for values in zip(phone_numbers.map(dataquality.preprocess_phone_number), df.loc[phone_numbers.index, 'Meter Number'], df.loc[phone_numbers.index, 'Account Number'])],
+        'dataquality.is_valid_email': lambda: emails.map(dataquality.is_valid_email),
+        'dataquality.preprocess_meter_numbers': lambda: dataquality.preprocess_meter_numbers(meter_numbers),
+        'dataquality.valid_meter_numbers': lambda: dataquality.valid_meter_numbers(dataquality.preprocess_meter_numbers(meter_numbers)),
+        'dataquality.preprocess_phone_numbers': lambda: dataquality.preprocess_phone_numbers(phone_numbers),
+        'dataquality.valid_phone_numbers': lambda: dataquality.valid_phone_numbers(dataquality.preprocess_phone_numbers(phone_numbers)),
+        'dataquality.valid_emails': lambda: dataquality.valid_emails(emails),
+        'dataquality.calculate_average_metrics': lambda: [dataquality.calculate_average_metrics(metrics_list, metric_name) for metric_name in ['Completeness', 'Validity', 'Integrity']],
+        'dataquality_data.calculate_validity': each_field(dataquality_data.calculate_validity, *params),
+        'dataquality_data.calculate_integrity': each_field(dataquality_data.calculate_integrity, params[0], 'Meter Number'),
+        'feature_calculations.calculate_unique_meter_count': lambda: feature_calculations.calculate_unique_meter_count(df, 'Year Month', 'Meter Number'),
+        'feature_calculations.calculate_metrics_by_month': lambda: feature_calculations.calculate_metrics_by_month(df, key_fields, *params),
+        'feature_calculations.calculate_metrics_by_month.uniqueness': lambda: feature_calculations.calculate_metrics_by_month(df, key_fields, *params, uniqueness=True, index=uniqueness_index),
+        'feature_calculations.calculate_metrics_by_month_from_counts': lambda: feature_calculations.calculate_metrics_by_month_from_counts(month_counts, key_fields, unique_meter_count),
+        'feature_calculations.calculate_blank_metrics': lambda: feature_calculations.calculate_blank_metrics(df, key_fields),
+        'feature_calculations.calculate_blank_counts': lambda: feature_calculations.calculate_blank_counts(df),
+        'feature_calculations.calculate_blank_metrics_from_counts': lambda: feature_calculations.calculate_blank_metrics_from_counts(blank_counts, key_fields),
+        'fieldcounts.calculate_field_counts': lambda: fieldcounts.calculate_field_counts(df, key_fields, streaming.PARTITION_COLUMNS, *params),
+        'fieldcounts.merge_field_counts': lambda: fieldcounts.merge_field_counts([counts, counts], ['Year Month']),
+        'fieldcounts.calculate_metrics_from_counts': lambda: fieldcounts.calculate_metrics_from_counts(counts),
+        'fieldcounts.calculate_group_metrics': lambda: fieldcounts.calculate_group_metrics(month_counts, key_fields, ['Year Month']),
+        'overallscore.calculate_overall_score': lambda: overallscore.calculate_overall_score(percentages, percentages, percentages),
+        'overallscore.calculate_overall_score_mom': lambda: overallscore.calculate_overall_score_mom(df),
+        'overallscore.calculate_overall_score_mom_from_counts': lambda: overallscore.calculate_overall_score_mom_from_counts(month_counts, key_fields),
+        'convert_percentage_to_scale.convert_percentage_to_scale': lambda: percentages.map(convert_percentage_to_scale.convert_percentage_to_scale),
+        'datacollectorscore.calculate_quality_score_by_collector': lambda: datacollectorscore.calculate_quality_score_by_collector(df, {}),
+        'datacollectorscore.calculate_quality_score_by_collector_from_counts': lambda: datacollectorscore.calculate_quality_score_by_collector_from_counts(collector_counts, key_fields),
+        'loader.prepare_extract': lambda: loader.prepare_extract(raw),
+        'loader.read_extract': lambda: loader.read_extract(extract_path),
+        'loader.read_extracts': lambda: loader.read_extracts([extract_path, extract_path]),
+        'loader.compact_extract': lambda: loader.compact_extract(df),
+        'loader.read_compact_extracts': lambda: loader.read_compact_extracts([extract_path, extract_path]),
+        'loader.read_compact_extracts.report': lambda: loader.read_compact_extracts([extract_path, extract_path], report=True),
+        'loader.memory_report': lambda: loader.memory_report(df, compact),
+        'loader.find_extracts': lambda: loader.find_extracts(workdir, 'extract*.csv'),
+        'loader.load_extracts': lambda: loader.load_extracts([extract_path, extract_path], workers=2),
+        'streaming.PartialAggregates': lambda: streaming.PartialAggregates(key_fields, *params).update(df).metrics_by_month(),
+        'streaming.score_extracts': lambda: streaming.score_extracts([extract_path], key_fields, *params, chunksize=max(rows // 4, 1)),
+        'parallel.score_partitions': lambda: parallel.score_partitions(df, key_fields, ['Year Month'], *params, workers=2),
+        'parallel.calculate_metrics_by_month_parallel': lambda: parallel.calculate_metrics_by_month_parallel(df, key_fields, *params, workers=2),
+        'parallel.calculate_overall_score_mom_parallel': lambda: parallel.calculate_overall_score_mom_parallel(df, workers=2),
+        'parallel.calculate_quality_score_by_collector_parallel': lambda: parallel.calculate_quality_score_by_collector_parallel(df, {}, workers=2),
+        'columnar.convert_extracts': lambda: columnar.convert_extracts([extract_path], fresh_dir('columnar')),
+        'columnar.load_columnar': lambda: columnar.load_columnar(cache_paths),
+        'annotations.annotate_quality': lambda: annotations.annotate_quality(df, plan=ruleplan.rule_plan(utility)),
+        'annotations.write_annotations': lambda: annotations.write_annotations([extract_path], fresh_dir('annotations'), plan=ruleplan.rule_plan(utility), chunksize=max(rows // 4, 1)),
+        'aggregatestore.AggregateStore': aggregate_store,
+        'sqlscoring.SqlScorer': sql_scorer,
+        'cube.QualityCube': lambda: cube.QualityCube(df, plan=ruleplan.rule_plan(utility)),
+        'cube.QualityCube.scores': lambda: quality_cube.scores(['Year Month', 'Meter Status']),
+        'multiutility.assign_utilities': lambda: multiutility.assign_utilities(df),
+        'multiutility.UtilityAggregates': lambda: multiutility.UtilityAggregates().update(df),
+        'multiutility.score_extracts_by_utility': lambda: multiutility.score_extracts_by_utility([extract_path], chunksize=max(rows // 4, 1)),
+        'nullprofile.NullProfile': lambda: nullprofile.NullProfile(df),
+        'nullprofile.NullProfile.blank_counts': lambda: null_profile.blank_counts(['Year Month', 'First Captured Username']),
+        'nullprofile.NullProfile.patterns': lambda: null_profile.patterns(['Account Number', 'Phone Number', 'Email'], ['Year Month']),
+        'preview.stratified_sample': lambda: preview.stratified_sample(df, seed=0),
+        'preview.preview_scores': lambda: preview.preview_scores(df, plan=ruleplan.rule_plan(utility), seed=0),
+        'uniqueness.UniquenessIndex': lambda: uniqueness.UniquenessIndex().add(df, 'month'),
+        'uniqueness.UniquenessIndex.counts': lambda: [uniqueness_index.counts(field_name, hashes) for field_name, hashes in identifier_hashes.items()],
+        'synthetic.make_extract': lambda: synthetic.make_extract(rows, utility, seed),
+        'synthetic.make_customers': lambda: synthetic.make_customers(rows, utility, seed),
+        'synthetic.write_extract': lambda: synthetic.write_extract(os.path.join(fresh_dir('synthetic'), 'extract.csv'), rows, utility, seed)
+    }
+
+    return cases
+
+def uncovered_functions(cases):
+    """
+    Public functions and classes defined in metrics/ that no benchmark covers.
+    """
+    uncovered = []
+    for module_info in pkgutil.iter_modules(metrics.__path__):
+        module = importlib.import_module(f'metrics.{module_info.name}')
+        for name, member in vars(module).items():
+            if name.startswith('_') or not (inspect.isfunction(member) or inspect.isclass(member)) or member.__module__ != module.__name__:
+                continue
+            if f'{module_info.name}.{name}' not in cases:
+                uncovered.append(f'{module_info.name}.{name}')
+
+    return uncovered
+
+def measure(function, repeat):
+    """
+    Best wall time over repeat runs, and the peak traced allocation of one more run
+    (allocations in worker processes are not traced).
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': min(timings), 'peak_mb': peak / 2 ** 20}
+
+def run_benchmarks(rows=100000, utility='ECG', seed=0, repeat=3, only=None):
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = benchmark_cases(rows, utility, seed, workdir)
+        results = {}
+        for name, function in cases.items():
+            if only is not None and only not in name:
+                continue
+            results[name] = measure(function, repeat)
+            print(f"{name:<70} {results[name]['seconds']:>9.4f} s {results[name]['peak_mb']:>9.1f} MB", flush=True)
+
+    return {
+        'rows': rows,
+        'utility': utility,
+        'seed': seed,
+        'environment': {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__, 'machine': platform.machine(), 'cpus': os.cpu_count()},
+        'results': results,
+        'uncovered': uncovered_functions(cases)
+    }
+
+def find_regressions(report, baseline, tolerance=0.25, min_seconds=0.005, min_mb=1.0):
+    """
+    Benchmarks at least tolerance (a fraction) slower or larger than the baseline.
+    Differences below min_seconds or min_mb are treated as noise.
+    """
+    regressions = []
+    for name, result in report['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        if result['seconds'] > previous['seconds'] * (1 + tolerance) and result['seconds'] - previous['seconds'] > min_seconds:
+            regressions.append({'name': name, 'measure': 'seconds', 'baseline': previous['seconds'], 'current': result['seconds']})
+        if result['peak_mb'] > previous['peak_mb'] * (1 + tolerance) and result['peak_mb'] - previous['peak_mb'] > min_mb:
+            regressions.append({'name': name, 'measure': 'peak_mb', 'baseline': previous['peak_mb'], 'current': result['peak_mb']})
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the metrics functions on synthetic CAIMS extracts.')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--utility', choices=sorted(synthetic.UTILITIES), default='ECG')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', help='only run benchmarks whose name contains this text')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against the results in this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.rows, args.utility, args.seed, args.repeat, args.only)
+    if report['uncovered']:
+        print('Not benchmarked: ' + ', '.join(report['uncovered']))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if (baseline['rows'], baseline['utility']) != (report['rows'], report['utility']):
+            print(f"Warning: baseline ran on {baseline['rows']} {baseline['utility']} rows")
+
+        regressions = find_regressions(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']} {regression['measure']}: {regression['baseline']:.4f} -> {regression['current']:.4f}")
+        if regressions:
+            return 1
+        print('No regressions')
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Score the raw extracts of a utility and write the monthly exports, without a notebook.
+
+    python -m metrics run --utility ecg --input data/extracts --out data/exports
+
+With --utility all (or a comma-separated list such as ecg,aedc) the extracts may
+mix utilities: each record is scored with the rules of the utility whose code
+(such as ECG) its SLRN starts with, in the same pass, and the exports carry a
+'Utility' column.
+
+Extracts are streamed in chunks, so memory is bounded by the chunk size and the
+number of months and collectors, not the number of records. Writes
+monthly_blank_metrics.csv, mom_metrics_<timestamp>.csv,
+mom_overall_score_<timestamp>.csv and collector_scores_<timestamp>.csv.
+"""
+import argparse
+import contextlib
+import datetime
+import os
+import sys
+import time
+
+# Fields of the notebooks' blank analysis
+BLANK_FIELDS = ['Account Number', 'Phone Number', 'Email']
+
+class UsageError(Exception):
+    """
+    Arguments that name no known utility or no extracts.
+    """
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m metrics', description='CAIMS data quality metrics.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='score extracts and write the monthly exports')
+    run_parser.add_argument('--utility', required=True, help='utility profile, e.g. ecg, aedc or yedc; several separated by commas, or all')
+    run_parser.add_argument('--input', required=True, help='directory of customers_*.csv extracts, or a glob')
+    run_parser.add_argument('--out', required=True, help='directory to write the exports to')
+    run_parser.add_argument('--slrn-prefix', help='keep only records whose SLRN starts with this prefix')
+    run_parser.add_argument('--blank-fields', default=','.join(BLANK_FIELDS), help='comma-separated fields of the blank metrics')
+    run_parser.add_argument('--chunksize', type=int, default=500000, help='records read at a time')
+    run_parser.add_argument('--memo-size', type=int, default=0, help='distinct values whose validity is remembered across chunks, per field; worth it only for fields whose values repeat (default 0, no memo)')
+    run_parser.add_argument('--profile', help='write a per-step timing profile to this JSON file')
+    run_parser.add_argument('--quiet', action='store_true', help='do not report progress')
+
+    return parser
+
+def run(args):
+    # Imported here so that --help and argument errors return without loading pandas
+    from metrics.dataquality import ValidationMemo
+    from metrics.loader import find_extracts, read_extract
+    from metrics.multiutility import UtilityAggregates
+    from metrics.profiling import profile
+    from metrics.ruleplan import UTILITY_PROFILES, rule_plan
+    from metrics.streaming import PartialAggregates
+
+    report = (lambda message: None) if args.quiet else (lambda message: print(message, file=sys.stderr))
+    start = time.perf_counter()
+
+    utilities = list(UTILITY_PROFILES) if args.utility.lower() == 'all' else args.utility.upper().split(',')
+    try:
+        plans = [rule_plan(utility) for utility in utilities]
+        paths = find_extracts(args.input)
+    except (KeyError, FileNotFoundError) as error:
+        # An unknown utility or no matching extracts
+        raise UsageError(error.args[0]) from error
+    os.makedirs(args.out, exist_ok=True)
+    stamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+
+    with profile() if args.profile else contextlib.nullcontext() as profiler:
+        memo = ValidationMemo(args.memo_size) if args.memo_size > 0 else None
+        if len(utilities) > 1:
+            aggregates = UtilityAggregates(utilities, memo=memo)
+        else:
+            aggregates = PartialAggregates(plan=plans[0], memo=memo)
+        for number, path in enumerate(paths, start=1):
+            records = 0
+            for chunk in read_extract(path, args.slrn_prefix, chunksize=args.chunksize):
+                aggregates.update(chunk)
+                records += len(chunk)
+            report(f'[{number}/{len(paths)}] scored {os.path.basename(path)}: {records:,} records')
+        if len(utilities) > 1 and aggregates.unmatched:
+            report(f'{aggregates.unmatched:,} records of none of {", ".join(utilities)} were not scored')
+
+        def collector_scores():
+            scores = aggregates.quality_score_by_collector()
+            # A single utility's scores are indexed by collector; write it as the first column
+            if 'First Captured Username' not in scores.columns:
+                scores = scores.rename_axis('First Captured Username').reset_index()
+            return scores
+
+        exports = {
+            'monthly_blank_metrics.csv': lambda: aggregates.blank_metrics(args.blank_fields.split(',')),
+            f'mom_metrics_{stamp}.csv': aggregates.metrics_by_month,
+            f'mom_overall_score_{stamp}.csv': aggregates.overall_score_mom,
+            f'collector_scores_{stamp}.csv': collector_scores
+        }
+        for name, export in exports.items():
+            # Each export is written and released before the next is built
+            export().to_csv(os.path.join(args.out, name), index=False)
+            report(f'wrote {os.path.join(args.out, name)}')
+
+    if args.profile:
+        profiler.write_json(args.profile)
+    if aggregates.memo is not None and len(aggregates.memo.summary()):
+        report(f'validity hit rate {aggregates.memo.hit_rate():.1f}%')
+    report(f'done in {time.perf_counter() - start:.1f} s')
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'run':
+            run(args)
+    except UsageError as error:
+        parser.error(error.args[0])
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
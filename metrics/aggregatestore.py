@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+from metrics.dataquality import KEY_FIELDS, RULE_VERSION
+from metrics.datacollectorscore import calculate_quality_score_by_collector_from_counts
+from metrics.feature_calculations import calculate_metrics_by_month_from_counts
+from metrics.streaming import PartialAggregates, score_extracts
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (position INTEGER PRIMARY KEY, path TEXT UNIQUE, file_key TEXT, size INTEGER, mtime_ns INTEGER);
+CREATE TABLE IF NOT EXISTS files (file_key TEXT PRIMARY KEY, columns TEXT);
+CREATE TABLE IF NOT EXISTS field_counts (
+    file_key TEXT, seq INTEGER, year_month TEXT, collector TEXT, key_field TEXT,
+    total_records INTEGER, complete INTEGER, valid INTEGER, integrity INTEGER
+);
+CREATE TABLE IF NOT EXISTS blank_counts (
+    file_key TEXT, seq INTEGER, year_month TEXT, field TEXT, total_records INTEGER, blanks INTEGER
+);
+CREATE TABLE IF NOT EXISTS meter_numbers (file_key TEXT, year_month TEXT, meter_number TEXT);
+CREATE INDEX IF NOT EXISTS field_counts_file ON field_counts (file_key);
+CREATE INDEX IF NOT EXISTS blank_counts_file ON blank_counts (file_key);
+CREATE INDEX IF NOT EXISTS meter_numbers_file ON meter_numbers (file_key, year_month);
+"""
+
+class AggregateStore:
+    """
+    Per-file, per-month aggregate counts persisted in a local SQLite database.
+    Files are keyed by content hash, RULE_VERSION, the scoring parameters and the
+    scored fields, so refresh only scores files that are new or changed; the
+    monthly metrics are then served from the stored counts without rescanning
+    any extract.
+    """
+
+    def __init__(self, path, bd_slrn='ECGBD', bdslrn_len=12, meter_slrn='ECGCR', mslrn_len=11, slrn_prefix=None, plan=None):
+        # A RulePlan supplies the rule parameters and the fields to score
+        if plan is not None:
+            bd_slrn, bdslrn_len, meter_slrn, mslrn_len = plan.rule_params
+
+        self.rule_params = (bd_slrn, bdslrn_len, meter_slrn, mslrn_len)
+        self.key_fields = KEY_FIELDS if plan is None else plan.key_fields
+        self.slrn_prefix = slrn_prefix
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+        # Stores created before sources recorded each file's size and modification time
+        source_columns = [row[1] for row in self.connection.execute('PRAGMA table_info(sources)')]
+        for column in ['size', 'mtime_ns']:
+            if column not in source_columns:
+                self.connection.execute(f'ALTER TABLE sources ADD COLUMN {column} INTEGER')
+
+    def close(self):
+        self.connection.close()
+
+    def refresh(self, paths, chunksize=500000):
+        """
+        Make paths (in order) the current set of extracts, scoring only the files
+        whose aggregates are not stored yet. A file listed more than once counts
+        once. Files whose size and modification time are unchanged since the last
+        refresh are not hashed again. Returns the paths that were scored.
+        """
+        # Overlapping globs can name the same extract twice
+        sources = {}
+        for path in paths:
+            sources.setdefault(os.path.realpath(path), path)
+
+        known = {source: (size, mtime_ns, file_key) for source, file_key, size, mtime_ns in self.connection.execute('SELECT path, file_key, size, mtime_ns FROM sources')}
+
+        scored = []
+        rows = []
+        for position, (source, path) in enumerate(sources.items()):
+            stat = os.stat(source)
+            file_key = self._file_key(source, stat, known.get(source))
+            if not self._has_file(file_key):
+                aggregates = score_extracts([path], self.key_fields, *self.rule_params, slrn_prefix=self.slrn_prefix, chunksize=chunksize)
+                self._save(file_key, aggregates)
+                scored.append(path)
+            rows.append((position, source, file_key, stat.st_size, stat.st_mtime_ns))
+
+        with self.connection:
+            self.connection.execute('DELETE FROM sources')
+            self.connection.executemany('INSERT INTO sources (position, path, file_key, size, mtime_ns) VALUES (?, ?, ?, ?, ?)', rows)
+
+            # Drop aggregates no current extract refers to
+            for table in ['files', 'field_counts', 'blank_counts', 'meter_numbers']:
+                self.connection.execute(f'DELETE FROM {table} WHERE file_key NOT IN (SELECT file_key FROM sources)')
+
+        return scored
+
+    def aggregates(self):
+        """
+        The stored counts of every current extract merged into one PartialAggregates
+        (without the per-month meter number sets; see unique_meter_count).
+        """
+        aggregates = PartialAggregates(self.key_fields, *self.rule_params)
+        aggregates.columns = []
+        for (columns,) in self.connection.execute('SELECT columns FROM files JOIN sources USING (file_key) ORDER BY position'):
+            aggregates.columns += [column for column in json.loads(columns) if column not in aggregates.columns]
+
+        counts = self._query(
+            'SELECT year_month, collector, key_field, total_records, complete, valid, integrity FROM field_counts JOIN sources USING (file_key) ORDER BY position, seq',
+            ['Year Month', 'First Captured Username', 'Key fields', 'Total Records', 'Complete', 'Valid', 'Integrity']
+        )
+        blank_counts = self._query(
+            'SELECT year_month, field, total_records, blanks FROM blank_counts JOIN sources USING (file_key) ORDER BY position, seq',
+            ['Year Month', 'Field', 'Total Records', 'Blanks']
+        )
+        aggregates.add_counts(counts)
+        aggregates.add_blank_counts(blank_counts)
+
+        return aggregates
+
+    def unique_meter_count(self):
+        rows = self.connection.execute('SELECT year_month, COUNT(DISTINCT meter_number) FROM meter_numbers JOIN sources USING (file_key) GROUP BY year_month').fetchall()
+        return pd.Series({pd.Period(year_month, 'M'): count for year_month, count in rows}, dtype='int64')
+
+    def metrics_by_month(self, key_fields):
+        """
+        The calculate_metrics_by_month result for the current extracts.
+        """
+        aggregates = self.aggregates()
+        key_fields = [field_name for field_name in key_fields if field_name in aggregates.columns]
+        return calculate_metrics_by_month_from_counts(aggregates.month_counts(), key_fields, self.unique_meter_count())
+
+    def overall_score_mom(self):
+        """
+        The monthly 'Overall Score' calculate_overall_score_mom merges onto each record,
+        one row per 'Year Month'.
+        """
+        return self.aggregates().overall_score_mom()
+
+    def blank_metrics(self, key_fields):
+        """
+        The calculate_blank_metrics result for the current extracts.
+        """
+        return self.aggregates().blank_metrics(key_fields)
+
+    def quality_score_by_collector(self, weights=None, formatted=True):
+        """
+        The calculate_quality_score_by_collector result for the current extracts.
+        """
+        aggregates = self.aggregates()
+        return calculate_quality_score_by_collector_from_counts(aggregates.collector_counts(), aggregates.scored_fields(), weights, formatted)
+
+    def _file_key(self, path, stat, known=None):
+        rule_key = json.dumps([RULE_VERSION, self.rule_params, self.key_fields, self.slrn_prefix])
+
+        # The last refresh's content hash holds while the size and modification time do
+        if known is not None:
+            size, mtime_ns, file_key = known
+            if (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns) and file_key.split(':', 1)[1] == rule_key:
+                return file_key
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as extract:
+            for block in iter(lambda: extract.read(1 << 20), b''):
+                digest.update(block)
+
+        return f'{digest.hexdigest()}:{rule_key}'
+
+    def _has_file(self, file_key):
+        return self.connection.execute('SELECT 1 FROM files WHERE file_key = ?', (file_key,)).fetchone() is not None
+
+    def _save(self, file_key, aggregates):
+        counts = aggregates.counts
+        blank_counts = aggregates.blank_counts
+
+        with self.connection:
+            self.connection.execute('INSERT INTO files (file_key, columns) VALUES (?, ?)', (file_key, json.dumps(aggregates.columns or [])))
+            if counts is not None:
+                self.connection.executemany(
+                    'INSERT INTO field_counts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    zip(
+                        [file_key] * len(counts), range(len(counts)),
+                        _month_text(counts['Year Month']), _nullable(counts['First Captured Username']), counts['Key fields'],
+                        *(counts[column].astype(int).tolist() for column in ['Total Records', 'Complete', 'Valid', 'Integrity'])
+                    )
+                )
+            if blank_counts is not None:
+                self.connection.executemany(
+                    'INSERT INTO blank_counts VALUES (?, ?, ?, ?, ?, ?)',
+                    zip(
+                        [file_key] * len(blank_counts), range(len(blank_counts)),
+                        _month_text(blank_counts['Year Month']), blank_counts['Field'],
+                        blank_counts['Total Records'].astype(int).tolist(), blank_counts['Blanks'].astype(int).tolist()
+                    )
+                )
+            for year_month, meter_numbers in aggregates.meter_numbers.items():
+                self.connection.executemany(
+                    'INSERT INTO meter_numbers VALUES (?, ?, ?)',
+                    ((file_key, str(year_month), str(meter_number)) for meter_number in meter_numbers)
+                )
+
+    def _query(self, sql, columns):
+        frame = pd.DataFrame(self.connection.execute(sql).fetchall(), columns=columns)
+        frame['Year Month'] = pd.PeriodIndex(frame['Year Month'], freq='M')
+        return frame
+
+def _month_text(year_months):
+    return [None if pd.isnull(year_month) else str(year_month) for year_month in year_months]
+
+def _nullable(values):
+    return [None if pd.isnull(value) else value for value in values]
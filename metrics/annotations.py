@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from metrics.dataquality import KEY_FIELDS, RuleMaskCache
+from metrics.loader import read_extract
+from metrics.ruleplan import rule_plan
+
+VALIDITY_LABELS = ['Not Valid', 'Valid']
+INTEGRITY_LABELS = ['No Integrity', 'Has Integrity']
+
+def annotate_quality(df, fields=None, plan=None, labels=True, cache=None):
+    """
+    The row-level data quality frame of the notebooks for df: each field followed
+    by its '<field> Validity' and '<field> Integrity' columns, then 'Date' and
+    'Meter Status'. With labels, the rule columns are categoricals holding the
+    dataquality_data strings ('Valid'/'Not Valid', 'Has Integrity'/'No Integrity');
+    otherwise nullable booleans. Rows where the field is blank are missing in both.
+    Without a plan the ECG rules are used, and fields defaults to the plan's key fields.
+    """
+    if plan is None:
+        plan = rule_plan('ECG')
+    if fields is None:
+        fields = plan.key_fields
+    if cache is None:
+        cache = RuleMaskCache(df)
+
+    results = {}
+    for field_name in fields:
+        results[field_name] = df[field_name]
+        if field_name in KEY_FIELDS:
+            complete = cache.complete(field_name).to_numpy()
+            valid = cache.validity(field_name, *plan.rule_params).to_numpy()
+            has_integrity = cache.integrity(field_name, plan.slrn_prefix, 'Meter Number').to_numpy()
+            results[f'{field_name} Validity'] = _rule_column(valid, complete, VALIDITY_LABELS if labels else None, df.index)
+            results[f'{field_name} Integrity'] = _rule_column(has_integrity, complete, INTEGRITY_LABELS if labels else None, df.index)
+        else:
+            # Fields without rules have no labels, as in dataquality_data
+            results[f'{field_name} Validity'] = pd.Series(None, index=df.index, dtype=object)
+            results[f'{field_name} Integrity'] = pd.Series(None, index=df.index, dtype=object)
+
+    results['Date'] = df['Date']
+    results['Meter Status'] = df['Meter Status']
+
+    return pd.DataFrame(results)
+
+def write_annotations(paths, output_dir, plan=None, fields=None, months=None, file_format='csv', labels=True, slrn_prefix=None, chunksize=500000):
+    """
+    Stream raw extract CSVs chunk by chunk through annotate_quality and write the
+    annotated rows partitioned by month, to output_dir/year_month=YYYY-MM/data.csv
+    (or data.parquet with file_format='parquet', which needs pyarrow). Only the
+    months listed in months (e.g. ['2024-05']) are written if given; rows without
+    a date are skipped. Peak memory is bounded by the chunk size. Returns the
+    written paths by month.
+    """
+    if months is not None:
+        months = {pd.Period(month, 'M') for month in months}
+    if file_format == 'parquet':
+        pa, parquet = _import_parquet()
+
+    written = {}
+    writers = {}
+    try:
+        for path in paths:
+            for chunk in read_extract(path, slrn_prefix, chunksize=chunksize):
+                chunk = chunk[chunk['Year Month'].notna()]
+                if months is not None:
+                    chunk = chunk[chunk['Year Month'].isin(months)]
+                if chunk.empty:
+                    continue
+
+                annotated = _writable(annotate_quality(chunk, fields, plan, labels))
+                for year_month, rows in annotated.groupby(chunk['Year Month'], sort=False, observed=True):
+                    first = year_month not in written
+                    if first:
+                        partition_dir = os.path.join(output_dir, f'year_month={year_month}')
+                        os.makedirs(partition_dir, exist_ok=True)
+                        written[year_month] = os.path.join(partition_dir, f'data.{file_format}')
+
+                    if file_format == 'parquet':
+                        table = pa.Table.from_pandas(rows, preserve_index=False)
+                        if first:
+                            writers[year_month] = parquet.ParquetWriter(written[year_month], table.schema)
+                        writers[year_month].write_table(table)
+                    else:
+                        rows.to_csv(written[year_month], mode='w' if first else 'a', header=first, index=False)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return written
+
+def _rule_column(mask, complete, rule_labels, index):
+    if rule_labels is None:
+        return pd.Series(pd.arrays.BooleanArray(mask, ~complete), index=index)
+
+    codes = np.where(complete, mask.astype(np.int8), np.int8(-1))
+    return pd.Series(pd.Categorical.from_codes(codes, categories=rule_labels), index=index)
+
+def _writable(annotated):
+    # Give every non-rule column a fixed type, so chunks where a field is all blank still share one schema
+    for column in annotated.columns:
+        if column != 'Date' and annotated[column].dtype == object:
+            annotated[column] = annotated[column].astype(pd.StringDtype())
+
+    return annotated
+
+def _import_parquet():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as parquet
+    except ImportError as error:
+        raise ImportError('Writing Parquet annotations needs pyarrow (pip install pyarrow)') from error
+
+    return pa, parquet
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from metrics.loader import read_extract
+
+# Columns the metrics functions read from a prepared extract
+METRIC_COLUMNS = [
+    'SLRN', 'Account Number', 'Meter Number', 'Meter Status', 'Meter SLRN', 'Phone Number', 'Email',
+    'Date', 'First Captured Username', 'Updated Username'
+]
+
+def convert_extracts(paths, cache_dir, slrn_prefix=None):
+    """
+    One-time conversion of raw extract CSVs into typed Arrow IPC (Feather) files in
+    cache_dir, one per extract and SLRN prefix. Identifier columns are stored as
+    strings, and files are written uncompressed so they can be memory-mapped. Each
+    cache file records the CSV's path, size and modification time and the prefix
+    it was filtered with, and is reused only while they all still match. Returns
+    the cache file paths.
+    """
+    feather = _import_feather()
+    import pyarrow as pa
+
+    os.makedirs(cache_dir, exist_ok=True)
+
+    cache_paths = []
+    for path in paths:
+        source = _source_metadata(path, slrn_prefix)
+        # Extracts of the same name in other directories, or with another prefix, get their own file
+        digest = hashlib.sha1(json.dumps([source[b'source'].decode(), slrn_prefix]).encode()).hexdigest()[:12]
+        cache_path = os.path.join(cache_dir, f'{os.path.splitext(os.path.basename(path))[0]}-{digest}.feather')
+
+        if not os.path.exists(cache_path) or not _is_fresh(cache_path, source):
+            # 'Year Month' is cheap to derive again on load
+            df = read_extract(path, slrn_prefix).drop(columns=['Year Month'])
+            table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), **source})
+            feather.write_feather(table, cache_path, compression='uncompressed')
+        cache_paths.append(cache_path)
+
+    return cache_paths
+
+def load_columnar(cache_paths, columns=None):
+    """
+    Load cached extracts memory-mapped, reading only the given columns (by default
+    the METRIC_COLUMNS present). String columns stay Arrow-backed instead of being
+    copied into Python objects, and 'Year Month' is derived from 'Date'.
+    """
+    feather = _import_feather()
+    import pyarrow as pa
+
+    tables = []
+    for cache_path in cache_paths:
+        wanted = columns if columns is not None else [column for column in METRIC_COLUMNS if column in _schema_names(cache_path)]
+        tables.append(feather.read_table(cache_path, columns=wanted, memory_map=True))
+
+    table = pa.concat_tables(tables, promote_options='default')
+    df = table.to_pandas(types_mapper={pa.string(): pd.StringDtype('pyarrow'), pa.large_string(): pd.StringDtype('pyarrow')}.get)
+
+    if 'Date' in df.columns:
+        df['Year Month'] = df['Date'].dt.to_period('M')
+
+    return df
+
+def _schema_names(cache_path):
+    import pyarrow.ipc as ipc
+
+    with ipc.open_file(cache_path) as reader:
+        return reader.schema.names
+
+def _source_metadata(path, slrn_prefix):
+    # What a cache file was converted from, as Arrow schema metadata
+    stat = os.stat(path)
+    return {
+        b'source': os.path.abspath(path).encode(),
+        b'source_size': str(stat.st_size).encode(),
+        b'source_mtime_ns': str(stat.st_mtime_ns).encode(),
+        b'slrn_prefix': json.dumps(slrn_prefix).encode()
+    }
+
+def _is_fresh(cache_path, source):
+    import pyarrow.ipc as ipc
+
+    with ipc.open_file(cache_path) as reader:
+        metadata = reader.schema.metadata or {}
+
+    return all(metadata.get(key) == value for key, value in source.items())
+
+def _import_feather():
+    try:
+        import pyarrow.feather as feather
+    except ImportError as error:
+        raise ImportError('The columnar extract cache needs pyarrow (pip install pyarrow)') from error
+
+    return feather
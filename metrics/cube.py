@@ -0,0 +1,123 @@
+import pandas as pd
+
+from metrics.datacollectorscore import calculate_quality_score_by_collector_from_counts
+from metrics.dataquality import KEY_FIELDS
+from metrics.feature_calculations import calculate_blank_counts, calculate_blank_metrics_from_counts, calculate_metrics_by_month_from_counts
+from metrics.fieldcounts import calculate_field_counts, calculate_group_metrics, merge_field_counts
+from metrics.overallscore import calculate_overall_score, calculate_overall_score_mom_from_counts
+from metrics.ruleplan import rule_plan
+
+CUBE_DIMENSIONS = ['Year Month', 'First Captured Username', 'Meter Status']
+
+class QualityCube:
+    """
+    Field counts (total, complete, valid, integrity) and blank counts of a frame
+    by month, collector and meter status, built in one pass over the row-level
+    masks. Queries roll the counts up to any combination of dimensions, optionally
+    filtered, without touching the rows again, and reproduce the month, collector,
+    overall and blank scorers. Without a plan the ECG rules are used.
+    """
+
+    def __init__(self, df, key_fields=None, plan=None, dimensions=None):
+        if plan is None:
+            plan = rule_plan('ECG')
+
+        self.plan = plan
+        self.columns = list(df.columns)
+        self.key_fields = plan.fields(df) if key_fields is None else [field_name for field_name in key_fields if field_name in df.columns]
+        self.dimensions = [column for column in (dimensions or CUBE_DIMENSIONS) if column in df.columns]
+
+        self.counts = calculate_field_counts(df, self.key_fields, self.dimensions, plan=plan, dropna=False)
+        self.blank_counts = calculate_blank_counts(df, self.dimensions)
+        self.unique_meter_count = df.groupby('Year Month', sort=False, observed=True)['Meter Number'].nunique()
+
+    def rollup(self, by, where=None):
+        """
+        Field counts summed to one row per group of the dimensions in by and key
+        field. where maps dimensions to the value, or list of values, to keep.
+        """
+        return merge_field_counts([self._filter(self.counts, where)], list(by))
+
+    def scores(self, by, where=None, key_fields=None):
+        """
+        Per-field Completeness, Validity and Integrity for each group of the
+        dimensions in by, with the group's averages and 'Overall Score'.
+        """
+        key_fields = self._fields(key_fields)
+        scores = calculate_group_metrics(self.rollup(by, where), key_fields, list(by))
+        scores['Overall Score'] = calculate_overall_score(scores['Average Completeness'], scores['Average Validity'], scores['Average Integrity'])
+
+        return scores
+
+    def metrics_by_month(self, key_fields=None, where=None):
+        """
+        The calculate_metrics_by_month result. 'Unique Meter Count' is only known
+        when where filters on 'Year Month' alone.
+        """
+        counts = self.rollup(['Year Month'], where)
+        counts = counts[counts['Year Month'].notna()]
+
+        unique_meter_count = self.unique_meter_count
+        if where and set(where) != {'Year Month'}:
+            unique_meter_count = pd.Series(dtype='int64')
+
+        return calculate_metrics_by_month_from_counts(counts, self._fields(key_fields), unique_meter_count)
+
+    def overall_score_mom(self, where=None):
+        """
+        The monthly 'Overall Score' of calculate_overall_score_mom, one row per month.
+        """
+        counts = self.rollup(['Year Month'], where)
+        overall_scores_df = calculate_overall_score_mom_from_counts(counts[counts['Year Month'].notna()], self.key_fields)
+
+        return overall_scores_df.sort_values('Year Month', kind='stable', ignore_index=True)
+
+    def quality_score_by_collector(self, weights=None, formatted=True, where=None):
+        """
+        The calculate_quality_score_by_collector result.
+        """
+        counts = self.rollup(['First Captured Username'], where)
+        counts = counts[counts['First Captured Username'].notna()]
+
+        return calculate_quality_score_by_collector_from_counts(counts, self.key_fields, weights, formatted)
+
+    def blank_metrics(self, key_fields, where=None):
+        """
+        The calculate_blank_metrics result; blanks of the collector and meter status
+        dimensions come from their missing groups.
+        """
+        blank_counts = self._filter(self.blank_counts, where)
+
+        # A dimension is blank exactly in the groups where its value is missing
+        group_totals = blank_counts.drop_duplicates(subset=self.dimensions)
+        for dimension in self.dimensions:
+            if dimension != 'Year Month' and dimension in key_fields:
+                dimension_counts = group_totals.assign(Field=dimension)
+                dimension_counts['Blanks'] = dimension_counts['Total Records'].where(dimension_counts[dimension].isna(), 0)
+                blank_counts = pd.concat([blank_counts, dimension_counts], ignore_index=True)
+
+        blank_counts = blank_counts.groupby(['Year Month', 'Field'], sort=False, dropna=False)[['Total Records', 'Blanks']].sum().reset_index()
+
+        return calculate_blank_metrics_from_counts(blank_counts, [field_name for field_name in key_fields if field_name in self.columns])
+
+    def _fields(self, key_fields):
+        key_fields = self.key_fields if key_fields is None else [field_name for field_name in key_fields if field_name in self.columns]
+
+        uncounted = [field_name for field_name in key_fields if field_name in KEY_FIELDS and field_name not in self.key_fields]
+        if uncounted:
+            raise ValueError(f'The cube was built without {uncounted}')
+
+        return key_fields
+
+    def _filter(self, frame, where):
+        if not where:
+            return frame
+
+        keep = pd.Series(True, index=frame.index)
+        for dimension, values in where.items():
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            if dimension == 'Year Month':
+                values = [pd.Period(value, 'M') for value in values]
+            keep &= frame[dimension].isin(values)
+
+        return frame[keep]
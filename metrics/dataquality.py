@@ -1,115 +1,482 @@
+import numpy as np
 import pandas as pd
 import re
 
-def calculate_data_quality_metrics(df, field_name, slrn_prefix, slrn_length, meter_prefix=None, meter_length=None):
+from metrics.profiling import timed
+
+# Patterns shared by the row-by-row validators and their vectorized counterparts
+METER_NUMBER_PATTERN = r'^[0-9a-zA-Z-]{5,14}$'
+PHONE_NUMBER_PATTERN = r'^(\+?233|\+?234)?0*\d{9,12}$'
+LOCAL_PHONE_NUMBER_PATTERN = r'^0\d{8,9}$'  # 9-10 digits for Ghana, 10-11 digits for Nigeria
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+EMAIL_PLACEHOLDER_PATTERN = r'(?:noemail|nomail|nil|noamail|nomai|example)'
+
+# Single-pass forms of the rules above for the vectorized validators:
+# - a meter number matching the format with at most three letters
+# - a phone number matching either phone pattern
+VALID_METER_NUMBER_PATTERN = r'^(?=[0-9a-zA-Z-]{5,14}$)(?:[0-9-]*[a-zA-Z]){0,3}[0-9-]*$'
+VALID_PHONE_NUMBER_PATTERN = r'^(?:(?:\+?233|\+?234)?0*\d{9,12}|0\d{8,9})$'
+
+# VALID_METER_NUMBER_PATTERN without its lookahead, which RE2 (pyarrow, DuckDB) does not support
+METER_NUMBER_FORMAT_PATTERN = r'^[0-9a-zA-Z-]{5,14}$'
+METER_NUMBER_LETTERS_PATTERN = r'^(?:[0-9-]*[a-zA-Z]){0,3}[0-9-]*$'
+
+# The vectorized validators run on Arrow-backed strings, whose .str methods use
+# pyarrow's compute kernels instead of a Python loop, when pyarrow is installed
+try:
+    import pyarrow as pa
+    ARROW_STRING = pd.StringDtype('pyarrow')
+except ImportError:
+    pa = None
+    ARROW_STRING = None
+
+# Bump whenever a validity or integrity rule changes so persisted aggregates get recomputed
+RULE_VERSION = 1
+
+# Fields with completeness, validity and integrity rules
+KEY_FIELDS = ['SLRN', 'Account Number', 'Meter Number', 'Meter SLRN', 'Phone Number', 'Email']
+
+# Identifiers that should not repeat across records
+UNIQUENESS_FIELDS = ['SLRN', 'Meter Number', 'Account Number']
+
+# Fields whose values repeat enough (placeholders, shared phones, re-captured meters) to validate per distinct value
+MEMOIZED_FIELDS = ['Meter Number', 'Phone Number', 'Email']
+
+# Records per evaluated value below which a field stops being memoized
+MEMO_MIN_REPEATS = 2
+
+def calculate_data_quality_metrics(df, field_name, slrn_prefix=None, slrn_length=None, meter_prefix=None, meter_length=None, cache=None, plan=None, uniqueness=False, index=None):
+    # A RulePlan (see metrics.ruleplan) supplies the utility's rule parameters;
+    # without a plan or rule parameters the ECG rules are used
+    if plan is None and slrn_prefix is None:
+        # Imported here because metrics.ruleplan imports this module
+        from metrics.ruleplan import rule_plan
+        plan = rule_plan('ECG')
+    if plan is not None:
+        slrn_prefix, slrn_length, meter_prefix, meter_length = plan.rule_params
+
     metrics = {'Completeness': 0, 'Validity': 0, 'Integrity': 0}
 
+    # Uniqueness is opt-in, and scored against a UniquenessIndex when one is given
+    uniqueness = uniqueness or index is not None
+    if uniqueness:
+        metrics['Uniqueness'] = 0 if field_name not in KEY_FIELDS else np.nan
+
     # Only calculate metrics for specified fields
-    if field_name in ['SLRN', 'Account Number', 'Meter Number', 'Meter SLRN', 'Phone Number', 'Email']:
-        # Completeness
-        completeness = df[field_name].count() / len(df) * 100
-        metrics['Completeness'] = completeness
-
-        # Validity
-        validity = calculate_validity(df, field_name, slrn_prefix, slrn_length, meter_prefix, meter_length)
-        metrics['Validity'] = (validity * completeness) / 100
-
-        # Integrity check
-        integrity = calculate_integrity(df, field_name, slrn_prefix, corresponding_meter_field='Meter Number')
-        metrics['Integrity'] = (integrity * completeness) / 100
+    with timed('calculate_data_quality_metrics', len(df), field=field_name):
+        if field_name in KEY_FIELDS:
+            if cache is None:
+                cache = RuleMaskCache(df)
+
+            # Completeness
+            completeness = cache.complete(field_name).sum() / len(df) * 100
+            metrics['Completeness'] = completeness
+
+            # Validity
+            validity = calculate_validity(df, field_name, slrn_prefix, slrn_length, meter_prefix, meter_length, cache=cache)
+            metrics['Validity'] = (validity * completeness) / 100
+
+            # Integrity check
+            integrity = calculate_integrity(df, field_name, slrn_prefix, corresponding_meter_field='Meter Number', cache=cache)
+            metrics['Integrity'] = (integrity * completeness) / 100
+
+            # Uniqueness; NaN for fields that may repeat
+            if uniqueness and field_name in UNIQUENESS_FIELDS:
+                metrics['Uniqueness'] = (calculate_uniqueness(df, field_name, index, cache=cache) * completeness) / 100
     
     return metrics
 
 # Helper functions
-def calculate_validity(df, field_name, slrn_prefix='', slrn_length=0, meter_prefix='', meter_length=0, corresponding_meter_field=''):
-    complete_records = df[df[field_name].notnull()].copy()
-    
+def calculate_validity(df, field_name, slrn_prefix='', slrn_length=0, meter_prefix='', meter_length=0, corresponding_meter_field='', cache=None, plan=None):
+    if plan is not None:
+        slrn_prefix, slrn_length, meter_prefix, meter_length = plan.rule_params
+    if cache is None:
+        cache = RuleMaskCache(df)
+
+    with timed('calculate_validity', len(df), field=field_name):
+        valid = cache.validity(field_name, slrn_prefix, slrn_length, meter_prefix, meter_length)
+    if valid is None:
+        return None
+
+    return _percentage(valid, cache.complete(field_name))
+
+def calculate_integrity(df, field_name, slrn_prefix='', corresponding_meter_field='', cache=None, plan=None):
+    if plan is not None:
+        slrn_prefix = plan.slrn_prefix
+    if cache is None:
+        cache = RuleMaskCache(df)
+
+    with timed('calculate_integrity', len(df), field=field_name):
+        has_integrity = cache.integrity(field_name, slrn_prefix, corresponding_meter_field)
+    if has_integrity is None:
+        return None
+
+    return _percentage(has_integrity, cache.complete(field_name))
+
+def calculate_uniqueness(df, field_name, index=None, cache=None):
+    if cache is None:
+        cache = RuleMaskCache(df)
+
+    with timed('calculate_uniqueness', len(df), field=field_name):
+        unique = cache.uniqueness(field_name, index)
+    if unique is None:
+        return None
+
+    return _percentage(unique, cache.complete(field_name))
+
+class RuleMaskCache:
+    """
+    Row-level masks behind the data quality metrics for a single DataFrame.
+    Each field's completeness mask, preprocessed values and validity/integrity masks
+    are computed on first use and reused by every metric, average and row label read
+    through the same cache. Dropping the cache (or calling clear) releases them.
+    With a ValidationMemo as memo, the validity of its fields is evaluated per
+    distinct value and the results are kept across caches.
+    """
+
+    def __init__(self, df, memo=None):
+        self.df = df
+        self.memo = memo
+        self._masks = {}
+
+    def text(self, field_name):
+        """
+        A field's column as Arrow-backed strings if it holds nothing but str values
+        and blanks, otherwise the column itself. Converted once for every rule.
+        """
+        return self._get(('text', field_name), lambda: _arrow_text(self.df[field_name]))
+
+    def complete(self, field_name):
+        return self._get(('complete', field_name), lambda: self.text(field_name).notnull())
+
+    def processed(self, field_name):
+        """
+        Complete values of a field after the preprocessing its validity rule expects.
+        """
+        def preprocess():
+            values = self.text(field_name)[self.complete(field_name)]
+            if field_name == 'Meter Number':
+                return preprocess_meter_numbers(values)
+            elif field_name == 'Phone Number':
+                return preprocess_phone_numbers(values)
+            return values
+
+        return self._get(('processed', field_name), preprocess)
+
+    def validity(self, field_name, slrn_prefix='', slrn_length=0, meter_prefix='', meter_length=0):
+        params = _validity_params(field_name, slrn_prefix, slrn_length, meter_prefix, meter_length)
+        return self._get(('validity', field_name) + params, lambda: validity_mask(self.df, field_name, slrn_prefix, slrn_length, meter_prefix, meter_length, cache=self))
+
+    def integrity(self, field_name, slrn_prefix='', corresponding_meter_field=''):
+        if field_name == 'SLRN':
+            params = (corresponding_meter_field,)
+        elif field_name == 'Account Number':
+            params = (slrn_prefix in ['YEDCBD', 'AEDCBD'],)
+        else:
+            params = ()
+
+        return self._get(('integrity', field_name) + params, lambda: integrity_mask(self.df, field_name, slrn_prefix, corresponding_meter_field, cache=self))
+
+    def uniqueness(self, field_name, index=None):
+        return self._get(('uniqueness', field_name, index), lambda: uniqueness_mask(self.df, field_name, index, cache=self))
+
+    def clear(self):
+        self._masks.clear()
+
+    def _get(self, key, compute):
+        if key not in self._masks:
+            # key is (step, field, rule parameters...)
+            with timed(key[0], len(self.df), field=key[1]):
+                self._masks[key] = compute()
+        return self._masks[key]
+
+def validity_mask(df, field_name, slrn_prefix='', slrn_length=0, meter_prefix='', meter_length=0, cache=None):
+    """
+    Evaluate the validity rule for a field over the whole frame.
+    Returns a boolean Series aligned with df; rows where the field is blank are False.
+    """
+    if cache is None:
+        cache = RuleMaskCache(df)
+
+    complete = cache.complete(field_name)
+
+    if cache.memo is not None and cache.memo.memoizes(field_name):
+        # Validate each distinct value once, through this same function on a frame of the distinct values
+        params = _validity_params(field_name, slrn_prefix, slrn_length, meter_prefix, meter_length)
+        evaluate = lambda values: validity_mask(pd.DataFrame({field_name: values}), field_name, slrn_prefix, slrn_length, meter_prefix, meter_length)
+        return _expand_mask(cache.memo.validity(df[field_name][complete], field_name, params, evaluate), complete)
+
+    complete_values = cache.processed(field_name)
+
     if field_name == 'SLRN':
-        return (complete_records[field_name].apply(lambda x: str(x).startswith(slrn_prefix) and len(str(x)) == slrn_length)).mean() * 100
+        values = _text(complete_values)
+        valid = values.str.startswith(slrn_prefix) & (values.str.len() == slrn_length)
     elif field_name == 'Meter SLRN':
-        return (complete_records[field_name].apply(lambda x: str(x).startswith(meter_prefix) and len(str(x)) >= meter_length)).mean() * 100
+        values = _text(complete_values)
+        valid = values.str.startswith(meter_prefix) & (values.str.len() >= meter_length)
     elif field_name == 'Account Number':
         if slrn_prefix in ['YEDCBD', 'AEDCBD']:
-            # Convert float values to integers before converting to strings and applying isnumeric check
-            # return (df['Meter Status'] == 'Unmetered').astype(int).mean() * 100
-            return (complete_records[field_name].astype(str).str.len() >= 6 | complete_records[field_name].notnull()).mean() * 100
+            # `|` binds tighter than `>=`, so this compares the length against 6 | True
+            valid = _text(complete_values).str.len() >= 6 | complete_values.notnull()
         else:
-            return (complete_records[field_name].astype(str).str.len() >= 5).mean() * 100 
-            #return (df[field_name].astype(str).apply(lambda x: x.isnumeric())).mean() * 100
+            valid = _text(complete_values).str.len() >= 5
     elif field_name == 'Meter Number':
-        # Preprocess meter numbers
-        complete_records.loc[:, 'Processed Meter Number'] = complete_records[field_name].apply(preprocess_meter_number)
-        
-        # Apply the validity check function to the preprocessed meter numbers
-        complete_records.loc[:, 'Meter Number Validity'] = complete_records['Processed Meter Number'].apply(is_valid_meter_number)
-        
-        return complete_records['Meter Number Validity'].mean() * 100
-    elif field_name == 'Phone Number':        
-        # Preprocess phone numbers
-        complete_records.loc[:, 'Processed Phone Number'] = complete_records[field_name].apply(preprocess_phone_number)
-        
-        # Apply the validity check function to the preprocessed phone numbers
-        complete_records.loc[:, 'Phone Number Validity'] = complete_records['Processed Phone Number'].apply(is_valid_phone_number)
-        
-        return complete_records['Phone Number Validity'].mean() * 100
+        valid = valid_meter_numbers(complete_values)
+    elif field_name == 'Phone Number':
+        valid = valid_phone_numbers(complete_values)
     elif field_name == 'Email':
-        # Apply the validity check function to the email field
-        complete_records.loc[:, 'Email Validity'] = complete_records[field_name].apply(is_valid_email)
-        
-        return complete_records['Email Validity'].mean() * 100
+        valid = valid_emails(complete_values)
     else:
         return None
 
-def calculate_integrity(df, field_name, slrn_prefix='', corresponding_meter_field=''):
-    complete_records = df[df[field_name].notnull()].copy()
-    
+    return _expand_mask(valid, complete)
+
+def integrity_mask(df, field_name, slrn_prefix='', corresponding_meter_field='', cache=None):
+    """
+    Evaluate the integrity rule for a field over the whole frame.
+    Returns a boolean Series aligned with df; rows where the field is blank are False.
+    """
+    if cache is None:
+        cache = RuleMaskCache(df)
+
+    complete = cache.complete
+
     if field_name == 'SLRN':
-        return ((complete_records[field_name].notnull()) & (complete_records[corresponding_meter_field].notnull() & (complete_records[corresponding_meter_field].str.len() > 5)) | complete_records['Account Number'].notnull()).mean() * 100
+        has_integrity = (complete(field_name)) & (complete(corresponding_meter_field) & (cache.text(corresponding_meter_field).str.len() > 5)) | complete('Account Number')
     elif field_name == 'Meter SLRN':
-        return ((complete_records['Meter SLRN'].str.len() > 10) & (complete_records['SLRN'].notnull()) & (complete_records['Meter Number'].notnull())).mean() * 100
+        has_integrity = (cache.text('Meter SLRN').str.len() > 10) & (complete('SLRN')) & (complete('Meter Number'))
     elif field_name == 'Meter Number':
-        # Preprocess meter numbers
-        complete_records['Processed Meter Number'] = complete_records[field_name].apply(preprocess_meter_number)
-        
-        # Apply the validity check function to the preprocessed meter numbers
-        complete_records['Meter Number Validity'] = complete_records['Processed Meter Number'].apply(is_valid_meter_number)
-        
+        # Validity already implies a preprocessed meter number of at least 5 characters
         has_integrity = (
-            (complete_records['Processed Meter Number'].notnull()) &
-            (complete_records['Processed Meter Number'].str.len() >= 5) &
-            (complete_records['Meter Status'] == 'Metered') &
-            (complete_records['SLRN'].notnull()) &
-            (complete_records['Meter Number Validity'])
+            (cache.validity(field_name)) &
+            (df['Meter Status'] == 'Metered') &
+            (complete('SLRN'))
         )
-        
-        return has_integrity.mean() * 100
     elif field_name == 'Email':
-        # Apply the validity check function to the email field
-        complete_records.loc[:, 'Email Validity'] = complete_records[field_name].apply(is_valid_email)
-        
-        valid_email = complete_records['Email Validity']
-        
-        combined_conditions = valid_email & (complete_records['Meter Number'].notnull() | complete_records['Account Number'].notnull())
-        
-        return combined_conditions.mean() * 100
-    elif field_name == 'Phone Number':        
-        # Preprocess phone numbers
-        complete_records.loc[:, 'Processed Phone Number'] = complete_records[field_name].apply(preprocess_phone_number)
-        
-        # Apply the validity check function to the preprocessed phone numbers
-        complete_records.loc[:, 'Phone Number Validity'] = complete_records['Processed Phone Number'].apply(is_valid_phone_number)
-        
-        combined_conditions = complete_records['Phone Number Validity'] & (complete_records['Meter Number'].notnull() | complete_records['Account Number'].notnull())
-        
-        return combined_conditions.mean() * 100
+        has_integrity = cache.validity(field_name) & (complete('Meter Number') | complete('Account Number'))
+    elif field_name == 'Phone Number':
+        has_integrity = cache.validity(field_name) & (complete('Meter Number') | complete('Account Number'))
     elif field_name == 'Account Number':
         if slrn_prefix in ['YEDCBD', 'AEDCBD']:
-            return ((complete_records[field_name].astype(str).str.len() >= 6 | complete_records[field_name].notnull()) & (complete_records['SLRN'].notnull() | complete_records['Meter Status'].notnull())).mean() * 100
+            has_integrity = (_text(cache.text(field_name)).str.len() >= 6 | complete(field_name)) & (complete('SLRN') | complete('Meter Status'))
         else:
-            return ((complete_records[field_name].astype(str).str.len() > 5) &  (complete_records['SLRN'].notnull()) & (complete_records['Meter Number'].notnull())).mean() * 100
+            has_integrity = (_text(cache.text(field_name)).str.len() > 5) & (complete('SLRN')) & (complete('Meter Number'))
     else:
         return None
 
+    return _as_mask(has_integrity) & complete(field_name)
+
+def uniqueness_mask(df, field_name, index=None, cache=None):
+    """
+    Flag records whose normalized identifier occurs exactly once: within df, or
+    among all records added to index (a UniquenessIndex, see metrics.uniqueness),
+    which must already include df. Returns a boolean Series aligned with df; rows
+    where the field is blank are False.
+    """
+    if field_name not in UNIQUENESS_FIELDS:
+        return None
+    if cache is None:
+        cache = RuleMaskCache(df)
+
+    complete = cache.complete(field_name)
+    hashes = hash_identifiers(cache.processed(field_name))
+    if index is None:
+        unique = ~pd.Series(hashes).duplicated(keep=False).to_numpy()
+    else:
+        unique = index.counts(field_name, hashes) == 1
+
+    return _expand_mask(pd.Series(unique), complete)
+
+class ValidationMemo:
+    """
+    Validity results of distinct field values, shared by every RuleMaskCache
+    created with it, so validators run once per distinct value rather than once per
+    record. Values are factorized and only those not already known are validated;
+    the results are broadcast back to the records. Results are kept across frames,
+    for up to maxsize values per field and rule parameters (least recently used
+    dropped first, None for no bound, 0 to keep nothing between frames). Only the
+    fields listed are memoized, and a field stops being memoized once a frame
+    averages fewer than min_repeats records per value it had to evaluate, since
+    factorizing values that hardly repeat costs more than it saves.
+    """
+
+    def __init__(self, maxsize=None, fields=None, min_repeats=MEMO_MIN_REPEATS):
+        self.maxsize = maxsize
+        self.fields = list(MEMOIZED_FIELDS if fields is None else fields)
+        self.min_repeats = min_repeats
+        # (field, rule parameters...) -> results indexed by value, and the call that last used each
+        self._results = {}
+        self._used = {}
+        self._calls = 0
+        self._skipped = set()
+        self._stats = {}
+
+    def __len__(self):
+        return sum(len(store) for store in self._results.values())
+
+    def memoizes(self, field_name):
+        """
+        Whether the validity of field_name is currently looked up in the memo.
+        """
+        return field_name in self.fields and field_name not in self._skipped
+
+    def validity(self, values, field_name, params, evaluate):
+        """
+        The validity of each of the complete values of a field, as a boolean Series
+        aligned with values. evaluate validates a Series of distinct values.
+        """
+        codes, uniques = pd.factorize(values)
+        # Validators read values as text; factorizing mixed objects could merge values like 1 and 1.0
+        if values.dtype == object and pd.api.types.infer_dtype(uniques, skipna=False) != 'string':
+            codes, uniques = pd.factorize(values.astype(str))
+        keys = pd.Index(uniques).astype(str)
+
+        key = (field_name,) + params
+        store = self._results.get(key)
+        self._calls += 1
+        positions = np.full(len(keys), -1, dtype=np.intp) if store is None else store.index.get_indexer(keys)
+        missing = positions < 0
+
+        results = np.zeros(len(keys), dtype=bool)
+        if store is not None:
+            results[~missing] = store.to_numpy()[positions[~missing]]
+        if missing.any():
+            results[missing] = np.asarray(evaluate(pd.Series(keys[missing])), dtype=bool)
+
+        if self.maxsize != 0:
+            self._store(key, positions, keys[missing], results[missing])
+
+        stats = self._stats.setdefault(field_name, [0, 0, 0])
+        stats[0] += len(values)
+        stats[1] += len(keys)
+        stats[2] += int(missing.sum())
+        if len(values) < self.min_repeats * missing.sum():
+            self._skipped.add(field_name)
+
+        return pd.Series(results[codes], index=values.index)
+
+    def summary(self):
+        """
+        Per memoized field: the records validated, their distinct values, how many
+        distinct values had to be evaluated, and the hit rate, the percentage of
+        records whose validity was not evaluated.
+        """
+        rows = []
+        for field_name, (records, distinct, evaluated) in self._stats.items():
+            rows.append({
+                'Field': field_name,
+                'Records': records,
+                'Distinct': distinct,
+                'Evaluated': evaluated,
+                'Hit Rate': _hit_rate(records, evaluated)
+            })
+
+        return pd.DataFrame(rows, columns=['Field', 'Records', 'Distinct', 'Evaluated', 'Hit Rate'])
+
+    def hit_rate(self):
+        """
+        The hit rate over every memoized field.
+        """
+        records = sum(stats[0] for stats in self._stats.values())
+        evaluated = sum(stats[2] for stats in self._stats.values())
+        return _hit_rate(records, evaluated)
+
+    def clear(self):
+        self._results.clear()
+        self._used.clear()
+        self._skipped.clear()
+        self._stats.clear()
+
+    def _store(self, key, positions, new_keys, new_results):
+        # Mark the known values used by this call and add the new ones, in bulk
+        store, used = self._results.get(key), self._used.get(key)
+        if store is None:
+            store, used = pd.Series(new_results, index=new_keys), np.full(len(new_keys), self._calls, dtype=np.int64)
+        else:
+            used[positions[positions >= 0]] = self._calls
+            if len(new_keys):
+                store = pd.concat([store, pd.Series(new_results, index=new_keys)])
+                used = np.concatenate([used, np.full(len(new_keys), self._calls, dtype=np.int64)])
+
+        if self.maxsize is not None and len(store) > self.maxsize:
+            # Keep the maxsize most recently used, in their stored order
+            keep = np.sort(np.argsort(-used, kind='stable')[:self.maxsize])
+            store, used = store.iloc[keep], used[keep]
+
+        self._results[key], self._used[key] = store, used
+
+def re2_pattern(pattern):
+    """
+    A pattern of this module rewritten for RE2 (pyarrow, DuckDB) to match what it
+    matches with re. RE2's \\d is ASCII only and its $ does not match before a
+    final newline; Python's \\d is any Unicode digit and its $ does.
+    """
+    return pattern.replace(r'\D', r'\P{Nd}').replace(r'\d', r'\p{Nd}').replace('$', r'\n?$')
+
+def hash_identifiers(values):
+    """
+    64-bit hashes of a Series of identifiers as text, stable across runs.
+    """
+    return pd.util.hash_array(values.astype(str).to_numpy(dtype=object)).view(np.int64)
+
+def _validity_params(field_name, slrn_prefix, slrn_length, meter_prefix, meter_length):
+    # The rule parameters a field's validity actually depends on
+    if field_name == 'SLRN':
+        return (slrn_prefix, slrn_length)
+    elif field_name == 'Meter SLRN':
+        return (meter_prefix, meter_length)
+    elif field_name == 'Account Number':
+        return (slrn_prefix in ['YEDCBD', 'AEDCBD'],)
+    return ()
+
+def _hit_rate(records, evaluated):
+    if records == 0:
+        return np.nan
+    return (records - evaluated) / records * 100
+
+def _percentage(mask, complete):
+    # Share of the complete records flagged by mask, matching mask[complete].mean() * 100
+    complete_count = complete.sum()
+    if complete_count == 0:
+        return np.nan
+    return mask.sum() / complete_count * 100
+
+def _as_mask(values):
+    # Coerce object or nullable boolean results to a plain bool Series, treating missing as False
+    return pd.Series(values.to_numpy(dtype=bool, na_value=False), index=values.index)
+
+def _text(values):
+    # Values as text, Arrow-backed where pyarrow is installed
+    if ARROW_STRING is None:
+        return values.astype(str)
+    if values.dtype == ARROW_STRING:
+        return values
+    if values.dtype != object or pd.api.types.infer_dtype(values, skipna=False) != 'string':
+        # Anything but a column of str goes through str() first, as astype(str) gives it
+        values = values.astype(str)
+    return values.astype(ARROW_STRING)
+
+def _arrow_text(values):
+    # An object column of str values and blanks as Arrow strings with the same blanks
+    if pa is None or values.dtype != object or pd.api.types.infer_dtype(values, skipna=True) != 'string':
+        return values
+    try:
+        array = pa.array(values.to_numpy(), type=pa.large_string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Values pyarrow will not store as strings
+        return values
+    return pd.Series(pd.arrays.ArrowStringArray(array), index=values.index, name=values.name)
+
+def _re2(values, pattern):
+    # The pattern for values' regex engine: RE2 for Arrow-backed strings, re otherwise
+    return re2_pattern(pattern) if values.dtype == ARROW_STRING else pattern
+
+def _expand_mask(mask, complete):
+    # Scatter a mask computed over the complete records back onto the full frame
+    expanded = np.zeros(len(complete), dtype=bool)
+    expanded[complete.to_numpy()] = mask.to_numpy(dtype=bool, na_value=False)
+    return pd.Series(expanded, index=complete.index)
+
 def preprocess_meter_number(meter_number):
     """
     Preprocess a meter number to remove scientific notation.
@@ -133,7 +500,7 @@ def is_valid_meter_number(meter_number):
     Check if a meter number is valid.
     """
     # Define conditions for meter number validity
-    valid_format = bool(re.match(r'^[0-9a-zA-Z-]{5,14}$', meter_number))
+    valid_format = bool(re.match(METER_NUMBER_PATTERN, meter_number))
     has_alpha_chars = sum(c.isalpha() for c in meter_number) <= 3
     
     # Check if all conditions are met
@@ -160,12 +527,8 @@ def is_valid_phone_number(phone_number):
     and have a total length of 12 for Ghana and 13 for Nigeria. Numbers without the country code should have a character
     length between 9 and 10 for Ghana or 10 and 11 for Nigeria to be considered valid.
     """
-    # Define regular expression pattern for valid phone numbers
-    pattern = r'^(\+?233|\+?234)?0*\d{9,12}$'
-    without_country_code_pattern = r'^0\d{8,9}$'  # 9-10 digits for Ghana, 10-11 digits for Nigeria
-    
     # Check if phone number matches any of the patterns
-    if re.match(pattern, phone_number) or re.match(without_country_code_pattern, phone_number):
+    if re.match(PHONE_NUMBER_PATTERN, phone_number) or re.match(LOCAL_PHONE_NUMBER_PATTERN, phone_number):
         return True
     else:
         return False
@@ -192,14 +555,72 @@ def is_valid_email(email):
     Check if an email is valid.
     """
     # Conditions for email validity
-    valid_format = re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', str(email)) is not None
-    has_valid_characters = re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', str(email)) is not None
+    valid_format = re.match(EMAIL_PATTERN, str(email)) is not None
+    has_valid_characters = re.match(EMAIL_PATTERN, str(email)) is not None
     has_no_placeholders = not pd.isnull(email) and str(email).strip() != ''
-    no_noemail = not re.search(r'(noemail|nomail|nil|noamail|nomai|example)', str(email), re.IGNORECASE)
+    no_noemail = not re.search(EMAIL_PLACEHOLDER_PATTERN, str(email), re.IGNORECASE)
     
     return valid_format and has_valid_characters and has_no_placeholders and no_noemail
 
 
+# Vectorized counterparts of the validators above, operating on whole Series at once
+def preprocess_meter_numbers(meter_numbers):
+    """
+    Preprocess a Series of meter numbers to remove scientific notation.
+    """
+    meter_numbers = _text(meter_numbers)
+
+    # Only values containing an exponent need the float round trip
+    scientific = _as_mask(meter_numbers.str.contains('[eE]'))
+    if scientific.any():
+        meter_numbers = meter_numbers.copy()
+        meter_numbers[scientific] = meter_numbers[scientific].map(preprocess_meter_number)
+
+    return meter_numbers
+
+
+def valid_meter_numbers(meter_numbers):
+    """
+    Check a Series of preprocessed meter numbers for validity.
+    """
+    if meter_numbers.dtype != ARROW_STRING:
+        return _as_mask(meter_numbers.str.match(VALID_METER_NUMBER_PATTERN))
+
+    # RE2 has no lookahead. The letters pattern already limits the characters, which
+    # leaves the length of the format, not counting a final newline Python's $ allows
+    valid = _as_mask(meter_numbers.str.match(_re2(meter_numbers, METER_NUMBER_LETTERS_PATTERN)))
+    lengths = meter_numbers.str.len() - meter_numbers.str.endswith('\n').astype(int)
+    return valid & _as_mask(lengths.between(5, 14))
+
+
+def preprocess_phone_numbers(phone_numbers):
+    """
+    Preprocess a Series of phone numbers to remove non-numeric characters.
+    """
+    phone_numbers = _text(phone_numbers)
+    return phone_numbers.str.replace(_re2(phone_numbers, r'\D'), '', regex=True)
+
+
+def valid_phone_numbers(phone_numbers):
+    """
+    Check a Series of preprocessed phone numbers for validity.
+    """
+    return _as_mask(phone_numbers.str.match(_re2(phone_numbers, VALID_PHONE_NUMBER_PATTERN)))
+
+
+def valid_emails(emails):
+    """
+    Check a Series of emails for validity.
+    """
+    values = _text(emails)
+
+    # A format match already rules out blank values
+    valid = _as_mask(values.str.match(_re2(values, EMAIL_PATTERN))) & emails.notnull()
+
+    # The placeholder search only needs to run on well-formed emails
+    return valid & ~_expand_mask(values[valid].str.contains(EMAIL_PLACEHOLDER_PATTERN, case=False), valid)
+
+
 def calculate_average_metrics(metrics_list, metric_name):
     # Calculate the average of a specific metric across all key fields
     valid_metrics = [metrics[metric_name] for metrics in metrics_list if metrics[metric_name] is not None]
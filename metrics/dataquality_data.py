@@ -1,98 +1,30 @@
 import pandas as pd
 import re
 
-from metrics.dataquality import preprocess_meter_number
-from metrics.dataquality import is_valid_meter_number
-from metrics.dataquality import preprocess_phone_number
-from metrics.dataquality import is_valid_phone_number
-from metrics.dataquality import pn_has_integrity
-from metrics.dataquality import is_valid_email
+from metrics.dataquality import RuleMaskCache
 
 
-def calculate_validity(df, field_name, slrn_prefix='', slrn_length=0, meter_prefix='', meter_length=0, corresponding_meter_field=''):
-    complete_records = df[df[field_name].notnull()].copy()
-    
-    if field_name == 'SLRN':
-        return (complete_records[field_name].apply(lambda x: str(x).startswith(slrn_prefix) and len(str(x)) == slrn_length)).map({True: 'Valid', False: 'Not Valid'})
-    elif field_name == 'Meter SLRN':
-        return (complete_records[field_name].apply(lambda x: str(x).startswith(meter_prefix) and len(str(x)) >= meter_length)).map({True: 'Valid', False: 'Not Valid'})
-    elif field_name == 'Account Number':
-        if slrn_prefix in ['YEDCBD', 'AEDCBD']:
-            # Convert float values to integers before converting to strings and applying isnumeric check
-            return (complete_records[field_name].astype(str).str.len() >= 6 | complete_records[field_name].notnull()).map({True: 'Valid', False: 'Not Valid'})
-        else:
-            return (complete_records[field_name].astype(str).str.len() >= 5).map({True: 'Valid', False: 'Not Valid'}) 
-    elif field_name == 'Meter Number':
-        # Preprocess meter numbers
-        complete_records.loc[:, 'Processed Meter Number'] = complete_records[field_name].apply(preprocess_meter_number)
-        
-        # Apply the validity check function to the preprocessed meter numbers
-        complete_records.loc[:, 'Meter Number Validity'] = complete_records['Processed Meter Number'].apply(is_valid_meter_number)
-        
-        return complete_records['Meter Number Validity'].map({True: 'Valid', False: 'Not Valid'})
-    elif field_name == 'Phone Number':        
-        # Preprocess phone numbers
-        complete_records.loc[:, 'Processed Phone Number'] = complete_records[field_name].apply(preprocess_phone_number)
-        
-        # Apply the validity check function to the preprocessed phone numbers
-        complete_records.loc[:, 'Phone Number Validity'] = complete_records['Processed Phone Number'].apply(is_valid_phone_number)
-        
-        return complete_records['Phone Number Validity'].map({True: 'Valid', False: 'Not Valid'})
-    elif field_name == 'Email':
-        # Apply the validity check function to the email field
-        complete_records.loc[:, 'Email Validity'] = complete_records[field_name].apply(is_valid_email)
-        
-        return complete_records['Email Validity'].map({True: 'Valid', False: 'Not Valid'})
-    else:
+def calculate_validity(df, field_name, slrn_prefix='', slrn_length=0, meter_prefix='', meter_length=0, corresponding_meter_field='', cache=None, plan=None):
+    if plan is not None:
+        slrn_prefix, slrn_length, meter_prefix, meter_length = plan.rule_params
+    if cache is None:
+        cache = RuleMaskCache(df)
+
+    valid = cache.validity(field_name, slrn_prefix, slrn_length, meter_prefix, meter_length)
+    if valid is None:
+        return None
+
+    return valid[cache.complete(field_name)].map({True: 'Valid', False: 'Not Valid'})
+
+
+def calculate_integrity(df, field_name, slrn_prefix='', corresponding_meter_field='', cache=None, plan=None):
+    if plan is not None:
+        slrn_prefix = plan.slrn_prefix
+    if cache is None:
+        cache = RuleMaskCache(df)
+
+    has_integrity = cache.integrity(field_name, slrn_prefix, corresponding_meter_field)
+    if has_integrity is None:
         return None
-    
 
-def calculate_integrity(df, field_name, slrn_prefix='', corresponding_meter_field=''):
-    complete_records = df[df[field_name].notnull()].copy()
-    
-    if field_name == 'SLRN':
-        return ((complete_records[field_name].notnull()) & (complete_records[corresponding_meter_field].notnull() & (complete_records[corresponding_meter_field].str.len() > 5)) | complete_records['Account Number'].notnull()).map({True: 'Has Integrity', False: 'No Integrity'})
-    elif field_name == 'Meter SLRN':
-        return ((complete_records['Meter SLRN'].str.len() > 10) & (complete_records['SLRN'].notnull()) & (complete_records['Meter Number'].notnull())).map({True: 'Has Integrity', False: 'No Integrity'})
-    elif field_name == 'Meter Number':
-        # Preprocess meter numbers
-        complete_records['Processed Meter Number'] = complete_records[field_name].apply(preprocess_meter_number)
-        
-        # Apply the validity check function to the preprocessed meter numbers
-        complete_records['Meter Number Validity'] = complete_records['Processed Meter Number'].apply(is_valid_meter_number)
-        
-        has_integrity = (
-            (complete_records['Processed Meter Number'].notnull()) &
-            (complete_records['Processed Meter Number'].str.len() >= 5) &
-            (complete_records['Meter Status'] == 'Metered') &
-            (complete_records['SLRN'].notnull()) &
-            (complete_records['Meter Number Validity'])
-        )
-        
-        return has_integrity.map({True: 'Has Integrity', False: 'No Integrity'})
-    elif field_name == 'Email':
-        # Apply the validity check function to the email field
-        complete_records.loc[:, 'Email Validity'] = complete_records[field_name].apply(is_valid_email)
-        
-        valid_email = complete_records['Email Validity']
-        
-        combined_conditions = valid_email & (complete_records['Meter Number'].notnull() | complete_records['Account Number'].notnull())
-        
-        return combined_conditions.map({True: 'Has Integrity', False: 'No Integrity'})
-    elif field_name == 'Phone Number':        
-        # Preprocess phone numbers
-        complete_records.loc[:, 'Processed Phone Number'] = complete_records[field_name].apply(preprocess_phone_number)
-        
-        # Apply the validity check function to the preprocessed phone numbers
-        complete_records.loc[:, 'Phone Number Validity'] = complete_records['Processed Phone Number'].apply(is_valid_phone_number)
-        
-        combined_conditions = complete_records['Phone Number Validity'] & (complete_records['Meter Number'].notnull() | complete_records['Account Number'].notnull())
-        
-        return combined_conditions.map({True: 'Has Integrity', False: 'No Integrity'})
-    elif field_name == 'Account Number':
-        if slrn_prefix in ['YEDCBD', 'AEDCBD']:
-            return ((complete_records[field_name].astype(str).str.len() >= 6 | complete_records[field_name].notnull()) & (complete_records['SLRN'].notnull() | complete_records['Meter Status'].notnull())).map({True: 'Has Integrity', False: 'No Integrity'})
-        else:
-            return ((complete_records[field_name].astype(str).str.len() > 5) &  (complete_records['SLRN'].notnull()) & (complete_records['Meter Number'].notnull())).map({True: 'Has Integrity', False: 'No Integrity'})
-    else:
-        return None
\ No newline at end of file
+    return has_integrity[cache.complete(field_name)].map({True: 'Has Integrity', False: 'No Integrity'})
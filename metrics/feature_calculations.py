@@ -1,94 +1,105 @@
+import numpy as np
 import pandas as pd
 import re
 
+from metrics.dataquality import KEY_FIELDS
 from metrics.overallscore import calculate_overall_score
-from metrics.dataquality import calculate_data_quality_metrics, calculate_average_metrics
+from metrics.fieldcounts import calculate_field_counts, calculate_group_metrics
+from metrics.nullprofile import NullProfile
+from metrics.profiling import timed
+from metrics.ruleplan import rule_plan
 
 def calculate_unique_meter_count(df, date_column, meter_number_column):
     unique_meter_count = df.groupby(date_column)[meter_number_column].nunique().reset_index()
     unique_meter_count.columns = [date_column, 'Unique Meter Count']
     return unique_meter_count
 
-def calculate_metrics_by_month(df, key_fields, bd_slrn, bdslrn_len, meter_slrn=None, mslrn_len=None):
-    result_data = []
-
-    for year_month in df['Year Month'].unique():
-        # Filter the DataFrame for the current year_month
-        df_month = df[df['Year Month'] == year_month].copy() 
-        
-        # Calculate metrics for the current month
-        metrics_list = []
-
-        for field_name in key_fields:
-            if field_name in df.columns:
-                if field_name in ['SLRN', 'Account Number', 'Meter Number', 'Meter SLRN']:
-                    metrics = calculate_data_quality_metrics(df_month, field_name, bd_slrn, bdslrn_len, meter_slrn, mslrn_len)
-                elif field_name == 'Phone Number':
-                    metrics = calculate_data_quality_metrics(df_month, field_name, bd_slrn, bdslrn_len, meter_slrn, mslrn_len)
-                elif field_name == 'Email':
-                    metrics = calculate_data_quality_metrics(df_month, field_name, bd_slrn, bdslrn_len, meter_slrn, mslrn_len)
-
-                metrics_list.append(metrics)
-
-        average_completeness = calculate_average_metrics(metrics_list, 'Completeness')
-        average_validity = calculate_average_metrics(metrics_list, 'Validity')
-        average_integrity = calculate_average_metrics(metrics_list, 'Integrity')
-        overall_score = calculate_overall_score(average_completeness, average_validity, average_integrity)
-
-        unique_meter_count = calculate_unique_meter_count(df_month, 'Year Month', 'Meter Number')['Unique Meter Count'].iloc[0]
-
-        # Construct metrics data for each field
-        for field_name in key_fields:
-            metrics_data = {
-                'Year Month': year_month,
-                'Key fields': field_name,
-                'Completeness': metrics_list[key_fields.index(field_name)]['Completeness'],
-                'Validity': metrics_list[key_fields.index(field_name)]['Validity'],
-                'Integrity': metrics_list[key_fields.index(field_name)]['Integrity'],
-                'Average Completeness': average_completeness,
-                'Average Validity': average_validity,
-                'Average Integrity': average_integrity,
-                'Overall Score': overall_score,
-                'Unique Meter Count': unique_meter_count
-            }
-            result_data.append(metrics_data)
-
-    # Convert the list of dictionaries to a DataFrame
-    result_df = pd.DataFrame(result_data)
+def calculate_metrics_by_month(df, key_fields=None, bd_slrn=None, bdslrn_len=None, meter_slrn=None, mslrn_len=None, plan=None, uniqueness=False, index=None):
+    # A RulePlan supplies the rule parameters, and the key fields unless given;
+    # without a plan or rule parameters every key field is scored with the ECG rules
+    if plan is None and bd_slrn is None:
+        plan = rule_plan('ECG')
+    if plan is not None:
+        bd_slrn, bdslrn_len, meter_slrn, mslrn_len = plan.rule_params
+    if key_fields is None:
+        key_fields = KEY_FIELDS if plan is None else plan.key_fields
+
+    # Score every month from one pass over the row-level masks instead of filtering per month
+    with timed('calculate_metrics_by_month', len(df)):
+        key_fields = [field_name for field_name in key_fields if field_name in df.columns]
+        counts = calculate_field_counts(df, key_fields, ['Year Month'], bd_slrn, bdslrn_len, meter_slrn, mslrn_len, uniqueness=uniqueness, index=index)
+        unique_meter_count = df.groupby('Year Month', sort=False, observed=True)['Meter Number'].nunique()
+
+        return calculate_metrics_by_month_from_counts(counts, key_fields, unique_meter_count)
+
+def calculate_metrics_by_month_from_counts(counts, key_fields, unique_meter_count):
+    """
+    Build the calculate_metrics_by_month result from monthly field counts
+    and a Series of unique meter counts indexed by 'Year Month'. Counts with a
+    'Unique' column add a 'Uniqueness' column after 'Integrity'.
+    """
+    result_df = calculate_group_metrics(counts, key_fields, ['Year Month'])
+    result_df['Overall Score'] = calculate_overall_score(result_df['Average Completeness'], result_df['Average Validity'], result_df['Average Integrity'])
+    result_df['Unique Meter Count'] = result_df['Year Month'].map(unique_meter_count)
+
+    result_df = result_df[[
+        'Year Month', 'Key fields', 'Completeness', 'Validity', 'Integrity'] + (['Uniqueness'] if 'Uniqueness' in result_df.columns else []) + [
+        'Average Completeness', 'Average Validity', 'Average Integrity', 'Overall Score', 'Unique Meter Count'
+    ]]
     result_df = result_df.sort_values(by='Year Month', ascending=True)
     
     return result_df
 
 def calculate_blank_metrics(df, key_fields):
-    result_data = []
-
-    for year_month in df['Year Month'].unique():
-        # Filter the DataFrame for the current year_month
-        df_month = df[df['Year Month'] == year_month]
-        
-        # Calculate metrics for the current month
-        metrics_list = []
-
-        for field_name in key_fields:
-            if field_name in df.columns:
-                total_records = len(df_month)
-                blanks = df_month[field_name].isnull().sum()
-                blank_percentage = (blanks / total_records) * 100
-
-                metrics = {
-                    'Year Month': year_month,
-                    'Field': field_name,
-                    'Total Records': total_records,
-                    'Blanks': blanks,
-                    'Blank Percentage': blank_percentage
-                }
-                
-                metrics_list.append(metrics)
-
-        result_data.extend(metrics_list)
-
-    # Convert the list of dictionaries to a DataFrame
-    result_df = pd.DataFrame(result_data)
+    """
+    Records, blanks and blank percentage of each of key_fields per month, counted
+    from a NullProfile of the fields in one pass over the frame.
+    """
+    fields = [field_name for field_name in key_fields if field_name in df.columns]
+
+    with timed('calculate_blank_metrics', len(df)):
+        counts = NullProfile(df, fields, ['Year Month']).blank_counts(['Year Month'])
+
+    return calculate_blank_metrics_from_counts(counts, fields)
+
+def calculate_blank_counts(df, group_by=['Year Month']):
+    """
+    Count records and blanks for every column per group, in one pass over the frame.
+    Returns one row per group (in order of first appearance) and column, with the
+    group_by columns, 'Field', 'Total Records' and 'Blanks'. Counts from disjoint
+    partitions can be merged by summing them.
+    """
+    fields = [column for column in df.columns if column not in group_by]
+    keys = [df[column] for column in group_by]
+    grouped = df[fields].isnull().groupby(keys, sort=False, observed=True, dropna=False)
+    blanks = grouped.sum()
+    sizes = grouped.size()
+
+    counts = blanks.index.repeat(len(fields)).to_frame(index=False)
+    counts['Field'] = np.tile(np.array(fields, dtype=object), len(blanks))
+    counts['Total Records'] = np.repeat(sizes.to_numpy(), len(fields))
+    counts['Blanks'] = blanks.to_numpy().ravel()
+
+    return counts
+
+def calculate_blank_metrics_from_counts(counts, key_fields):
+    """
+    Build the calculate_blank_metrics result from monthly blank counts.
+    """
+    counts = counts[counts['Year Month'].notna() & counts['Field'].isin(key_fields)]
+
+    # Lay the rows out month by month in key_fields order, as calculate_blank_metrics does
+    field_order = {field_name: position for position, field_name in enumerate(key_fields)}
+    month_order = pd.Series(range(len(counts)), index=counts.index).groupby(counts['Year Month'], sort=False).transform('min')
+    counts = counts.assign(_month=month_order, _field=counts['Field'].map(field_order)).sort_values(['_month', '_field'], kind='stable')
+
+    result_df = pd.DataFrame({
+        'Year Month': counts['Year Month'].to_numpy(),
+        'Field': counts['Field'].to_numpy(),
+        'Total Records': counts['Total Records'].to_numpy(),
+        'Blanks': counts['Blanks'].to_numpy(),
+        'Blank Percentage': (counts['Blanks'] / counts['Total Records']).to_numpy() * 100
+    })
     result_df = result_df.sort_values(by='Year Month', ascending=True)
     
-    return result_df
\ No newline at end of file
+    return result_df
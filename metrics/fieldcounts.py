@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from metrics.dataquality import KEY_FIELDS, UNIQUENESS_FIELDS, RuleMaskCache
+from metrics.profiling import timed
+
+COUNT_COLUMNS = ['Total Records', 'Complete', 'Valid', 'Integrity']
+
+def calculate_field_counts(df, key_fields, group_by, slrn_prefix=None, slrn_length=None, meter_prefix=None, meter_length=None, cache=None, dropna=True, plan=None, uniqueness=False, index=None):
+    """
+    Count complete, valid and integrity records per group and key field.
+    The row-level masks are computed once for the whole frame and reduced with a
+    single groupby-sum. Returns one row per group (in order of first appearance)
+    and field, with the group_by columns, 'Key fields' and the COUNT_COLUMNS.
+    Counts from disjoint partitions of a frame can be merged by summing them.
+    Groups with a missing key are dropped unless dropna is False.
+    A RulePlan passed as plan supplies the rule parameters. With uniqueness (or a
+    UniquenessIndex as index) a 'Unique' count is added, which is zero for fields
+    outside UNIQUENESS_FIELDS.
+    """
+    if plan is not None:
+        slrn_prefix, slrn_length, meter_prefix, meter_length = plan.rule_params
+    uniqueness = uniqueness or index is not None
+    measures = ['Complete', 'Valid', 'Integrity'] + (['Unique'] if uniqueness else [])
+    if cache is None:
+        cache = RuleMaskCache(df)
+
+    fields = [field_name for field_name in key_fields if field_name in df.columns and field_name in KEY_FIELDS]
+
+    masks = {}
+    for field_name in fields:
+        masks[(field_name, 'Complete')] = cache.complete(field_name)
+        masks[(field_name, 'Valid')] = cache.validity(field_name, slrn_prefix, slrn_length, meter_prefix, meter_length)
+        masks[(field_name, 'Integrity')] = cache.integrity(field_name, slrn_prefix, corresponding_meter_field='Meter Number')
+        if uniqueness:
+            unique = cache.uniqueness(field_name, index)
+            masks[(field_name, 'Unique')] = unique if unique is not None else np.zeros(len(df), dtype=bool)
+
+    keys = [df[column] for column in group_by]
+    with timed('group counts', len(df), group_by=', '.join(group_by)):
+        grouped = pd.DataFrame(masks, index=df.index).groupby(keys, sort=False, observed=True, dropna=dropna)
+        sums = grouped.sum()
+        sizes = grouped.size()
+
+    # Lay the counts out as one row per (group, field), groups outermost
+    counts = sums.index.repeat(len(fields)).to_frame(index=False)
+    counts['Key fields'] = np.tile(np.array(fields, dtype=object), len(sums))
+    counts['Total Records'] = np.repeat(sizes.to_numpy(), len(fields))
+    for measure in measures:
+        counts[measure] = sums[[(field_name, measure) for field_name in fields]].to_numpy().ravel()
+
+    return counts
+
+def merge_field_counts(counts_list, group_by):
+    """
+    Sum field counts computed over disjoint partitions of the same data.
+    """
+    counts = pd.concat(counts_list, ignore_index=True)
+    count_columns = COUNT_COLUMNS + (['Unique'] if 'Unique' in counts.columns else [])
+    return counts.groupby(group_by + ['Key fields'], sort=False, observed=True, dropna=False)[count_columns].sum().reset_index()
+
+def calculate_metrics_from_counts(counts):
+    """
+    Completeness, Validity and Integrity for each row of a field counts frame,
+    computed the same way calculate_data_quality_metrics does.
+    """
+    completeness = counts['Complete'] / counts['Total Records'] * 100
+    validity = counts['Valid'] / counts['Complete'] * 100
+    integrity = counts['Integrity'] / counts['Complete'] * 100
+
+    metrics = counts.drop(columns=COUNT_COLUMNS)
+    metrics['Completeness'] = completeness
+    metrics['Validity'] = (validity * completeness) / 100
+    metrics['Integrity'] = (integrity * completeness) / 100
+
+    if 'Unique' in counts.columns:
+        uniqueness = counts['Unique'] / counts['Complete'] * 100
+        metrics = metrics.drop(columns=['Unique'])
+        metrics['Uniqueness'] = ((uniqueness * completeness) / 100).where(counts['Key fields'].isin(UNIQUENESS_FIELDS))
+
+    return metrics
+
+def calculate_group_metrics(counts, key_fields, group_by):
+    """
+    Per-field metrics for every group in a field counts frame, laid out as one row
+    per (group, key field) in key_fields order, with each group's average
+    completeness, validity and integrity alongside.
+    Fields without rules score zero, as in calculate_data_quality_metrics.
+    """
+    field_metrics = calculate_metrics_from_counts(counts)
+    groups = field_metrics[group_by].drop_duplicates()
+
+    metrics = groups.loc[groups.index.repeat(len(key_fields))].reset_index(drop=True)
+    metrics['Key fields'] = np.tile(np.array(key_fields, dtype=object), len(groups))
+    metrics = metrics.merge(field_metrics, on=group_by + ['Key fields'], how='left', sort=False)
+
+    unscored = ~metrics['Key fields'].isin(KEY_FIELDS)
+    metrics.loc[unscored, [column for column in ['Completeness', 'Validity', 'Integrity', 'Uniqueness'] if column in metrics.columns]] = 0
+
+    # Sum fields in key_fields order, like calculate_average_metrics does for each group
+    for metric_name in ['Completeness', 'Validity', 'Integrity']:
+        values = metrics[metric_name].to_numpy(dtype=float).reshape(len(groups), len(key_fields))
+        total = values[:, 0]
+        for column in range(1, len(key_fields)):
+            total = total + values[:, column]
+        metrics[f'Average {metric_name}'] = np.repeat(total / len(key_fields), len(key_fields))
+
+    return metrics
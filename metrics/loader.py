@@ -0,0 +1,197 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Raw CAIMS extract columns and the names the metrics functions expect
+COLUMN_MAPPING = {
+    'slrn': 'SLRN',
+    'ac_no': 'Account Number',
+    'meter_number': 'Meter Number',
+    'meter_status': 'Meter Status',
+    'meter_slrn': 'Meter SLRN',
+    'phone_number': 'Phone Number',
+    'email': 'Email',
+    'date': 'Date',
+    'first_captured_username': 'First Captured Username',
+    'updated_username': 'Updated Username'
+}
+
+# Raw columns read as text so identifiers are never parsed as floats
+TEXT_COLUMNS = [column for column in COLUMN_MAPPING if column != 'date'] + ['is_on_board']
+
+# Low-cardinality columns held as categoricals, and identifiers held as Arrow-backed strings
+CATEGORY_COLUMNS = ['Meter Status', 'First Captured Username', 'Updated Username', 'is_on_board']
+IDENTIFIER_COLUMNS = ['SLRN', 'Account Number', 'Meter Number', 'Meter SLRN', 'Phone Number', 'Email']
+
+def prepare_extract(df, slrn_prefix=None):
+    """
+    Apply the notebook preparation steps to a raw extract: drop direct connections,
+    rename the columns, keep SLRNs starting with slrn_prefix (all rows if None)
+    and derive 'Year Month' from 'Date'.
+    """
+    if 'is_on_board' in df.columns:
+        df = df[df['is_on_board'] != 'Direct Connection']
+
+    df = df.rename(columns=COLUMN_MAPPING)
+
+    if slrn_prefix is not None:
+        df = df[df['SLRN'].fillna('').astype(str).str.startswith(slrn_prefix)]
+
+    df = df.copy()
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['Year Month'] = df['Date'].dt.to_period('M')
+
+    return df
+
+def read_extract(path, slrn_prefix=None, chunksize=None):
+    """
+    Read a raw extract CSV with only the columns the metrics use, prepared with
+    prepare_extract. With a chunksize, yields prepared chunks instead.
+    """
+    wanted = set(COLUMN_MAPPING) | {'is_on_board'}
+    options = dict(
+        usecols=lambda column: column in wanted,
+        dtype={column: str for column in TEXT_COLUMNS},
+        low_memory=False
+    )
+
+    if chunksize is None:
+        return prepare_extract(pd.read_csv(path, **options), slrn_prefix)
+
+    return (prepare_extract(chunk, slrn_prefix) for chunk in pd.read_csv(path, chunksize=chunksize, **options))
+
+def read_extracts(paths, slrn_prefix=None):
+    """
+    Read and concatenate several raw extract CSVs.
+    """
+    return pd.concat([read_extract(path, slrn_prefix) for path in paths], ignore_index=True)
+
+def compact_extract(df):
+    """
+    Convert a prepared extract to the compact schema: CATEGORY_COLUMNS as
+    categoricals and IDENTIFIER_COLUMNS as Arrow-backed strings. 'Year Month'
+    stays a period column, 8 bytes per record. Missing values stay missing, so
+    the metrics come out the same as on the object-dtype frame.
+    """
+    df = df.copy()
+
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    for column in IDENTIFIER_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype(pd.StringDtype('pyarrow'))
+
+    return df
+
+def read_compact_extracts(paths, slrn_prefix=None, report=False):
+    """
+    Read and concatenate several raw extract CSVs in the compact schema.
+    Each extract is compacted as it is read, so the object-dtype copy of only one
+    extract is held at a time. With report, also returns the memory_report of
+    the read_extracts result against the compact one, measuring each extract's
+    object-dtype copy before it is compacted.
+    """
+    frames = []
+    before = None
+    for path in paths:
+        df = read_extract(path, slrn_prefix)
+        if report:
+            usage = _column_memory(df)
+            before = usage if before is None else before.add(usage, fill_value=0)
+        frames.append(compact_extract(df))
+    df = _concat_compact(frames)
+
+    if not report:
+        return df
+    return df, memory_report(before, df)
+
+def find_extracts(source, pattern='customers_*.csv'):
+    """
+    The sorted paths of the extracts in a directory (files matching pattern), or
+    matching a glob.
+    """
+    if os.path.isdir(source):
+        source = os.path.join(source, pattern)
+
+    paths = sorted(glob.glob(source))
+    if not paths:
+        raise FileNotFoundError(f'No extracts match {source}')
+
+    return paths
+
+def load_extracts(source, slrn_prefix=None, workers=None, processes=False, compact=False, progress=None):
+    """
+    Read the extracts in a directory or glob (see find_extracts), or a list of
+    paths, concurrently in a pool of at most workers threads (processes with
+    processes=True), one CPU each by default. Every file is prepared by the worker
+    that reads it and the frames are concatenated in path order, so the result is
+    the read_extracts result (read_compact_extracts with compact). progress, such
+    as print, is called with a line for each finished file. Returns the frame and
+    the per-file timings ('Path', 'Rows', 'Seconds').
+    """
+    paths = find_extracts(source) if isinstance(source, str) else list(source)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(paths)))
+
+    frames = [None] * len(paths)
+    timings = [None] * len(paths)
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        futures = {executor.submit(_timed_read, path, slrn_prefix, compact): number for number, path in enumerate(paths)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            number = futures[future]
+            frames[number], seconds = future.result()
+            timings[number] = {'Path': paths[number], 'Rows': len(frames[number]), 'Seconds': seconds}
+            if progress is not None:
+                progress(f'[{done}/{len(paths)}] {os.path.basename(paths[number])}: {len(frames[number]):,} rows in {seconds:.2f} s')
+
+    df = _concat_compact(frames) if compact else pd.concat(frames, ignore_index=True)
+
+    return df, pd.DataFrame(timings, columns=['Path', 'Rows', 'Seconds'])
+
+def memory_report(before, after):
+    """
+    Deep memory usage in MB of each column of two versions of a frame (for example
+    the read_extracts and read_compact_extracts results), with a 'Total' row.
+    Either version may also be given as its per-column usage in bytes, so the
+    frames need not be held at the same time (see read_compact_extracts).
+    """
+    before, after = _column_memory(before), _column_memory(after)
+    report = pd.DataFrame({
+        'Before (MB)': before / 2 ** 20,
+        'After (MB)': after / 2 ** 20
+    }, index=before.index.union(after.index, sort=False))
+    report.loc['Total'] = report.sum()
+    report['Reduction (%)'] = (1 - report['After (MB)'] / report['Before (MB)']) * 100
+
+    return report.round(2)
+
+def _column_memory(data):
+    # Deep memory usage in bytes of each column of a frame; usage Series pass through
+    if isinstance(data, pd.DataFrame):
+        return data.memory_usage(index=False, deep=True)
+    return data
+
+def _timed_read(path, slrn_prefix, compact):
+    start = time.perf_counter()
+    df = read_extract(path, slrn_prefix)
+    if compact:
+        df = compact_extract(df)
+
+    return df, time.perf_counter() - start
+
+def _concat_compact(frames):
+    # Concatenating categoricals with different categories would fall back to object
+    for column in CATEGORY_COLUMNS:
+        if column in frames[0].columns:
+            categories = union_categoricals([frame[column] for frame in frames]).categories
+            for frame in frames:
+                frame[column] = frame[column].cat.set_categories(categories)
+
+    return pd.concat(frames, ignore_index=True)
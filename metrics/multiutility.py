@@ -0,0 +1,106 @@
+import pandas as pd
+
+from metrics.loader import read_extract
+from metrics.ruleplan import UTILITY_PROFILES, rule_plan
+from metrics.streaming import PartialAggregates
+
+def assign_utilities(df, utilities=None):
+    """
+    The utility of each record: the one whose code its 'SLRN' starts with, or
+    failing that the one whose meter SLRN code its 'Meter SLRN' starts with,
+    longest code first. A code is the utility's name where its prefix starts with
+    it ('ECG' for 'ECGBD' and 'ECGCR'), else the whole prefix. Only the code is
+    matched, as the notebooks filter extracts, so a record with a wrong prefix
+    after it is routed to its utility and scored invalid there. Missing for
+    records of none of the utilities (all registered utilities if None).
+    """
+    plans = [rule_plan(utility) for utility in (UTILITY_PROFILES if utilities is None else utilities)]
+    assigned = pd.Series(None, index=df.index, dtype=object)
+
+    slrn_codes = {_utility_code(plan.utility, plan.slrn_prefix): plan.utility for plan in plans}
+    meter_codes = {_utility_code(plan.utility, plan.meter_prefix): plan.utility for plan in plans if plan.meter_prefix}
+    for column, codes in [('SLRN', slrn_codes), ('Meter SLRN', meter_codes)]:
+        if column not in df.columns:
+            continue
+
+        values = df.loc[assigned.isna(), column].dropna().astype(str)
+        # One slice and lookup per distinct code length, not one scan per utility
+        for length in sorted({len(code) for code in codes}, reverse=True):
+            matched = values.str[:length].map(codes).dropna()
+            assigned.loc[matched.index] = matched
+            values = values.drop(matched.index)
+
+    return assigned
+
+class UtilityAggregates:
+    """
+    PartialAggregates of several utilities fed from frames that mix their
+    records. Every record is routed to its utility by assign_utilities and scored
+    with that utility's rules only, so one pass over a combined extract scores
+    every utility. Records of none of the utilities are counted in unmatched. The
+    results are the PartialAggregates results of each utility that had records,
+    stacked with a leading 'Utility' column. A ValidationMemo passed as memo is
+    shared; it keeps results per rule parameters.
+    """
+
+    def __init__(self, utilities=None, memo=None):
+        utilities = list(UTILITY_PROFILES) if utilities is None else list(utilities)
+
+        self.aggregates = {utility: PartialAggregates(plan=rule_plan(utility), memo=memo) for utility in utilities}
+        self.memo = memo
+        self.unmatched = 0
+
+    def update(self, df):
+        """
+        Add the counts for a prepared chunk of records of any of the utilities.
+        """
+        utilities = assign_utilities(df, self.aggregates)
+        self.unmatched += int(utilities.isna().sum())
+
+        for utility, records in df.groupby(utilities, sort=False):
+            self.aggregates[utility].update(records)
+
+        return self
+
+    def metrics_by_month(self):
+        return self._combine(lambda aggregates: aggregates.metrics_by_month())
+
+    def overall_score_mom(self):
+        return self._combine(lambda aggregates: aggregates.overall_score_mom())
+
+    def quality_score_by_collector(self, weights=None, formatted=True):
+        """
+        Each utility's collector scores, with the collector as a
+        'First Captured Username' column after 'Utility'.
+        """
+        return self._combine(lambda aggregates: aggregates.quality_score_by_collector(weights, formatted).rename_axis('First Captured Username').reset_index())
+
+    def blank_metrics(self, key_fields):
+        return self._combine(lambda aggregates: aggregates.blank_metrics(key_fields))
+
+    def _combine(self, result):
+        frames = []
+        for utility, aggregates in self.aggregates.items():
+            if aggregates.columns is None:
+                continue
+            frame = result(aggregates)
+            frame.insert(0, 'Utility', utility)
+            frames.append(frame)
+
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame({'Utility': []})
+
+def score_extracts_by_utility(paths, utilities=None, chunksize=500000, memo=None):
+    """
+    Stream raw extract CSVs holding records of several utilities in fixed-size
+    chunks, scoring each record with its own utility's rules.
+    """
+    aggregates = UtilityAggregates(utilities, memo)
+
+    for path in paths:
+        for chunk in read_extract(path, chunksize=chunksize):
+            aggregates.update(chunk)
+
+    return aggregates
+
+def _utility_code(utility, prefix):
+    return utility if prefix.startswith(utility) else prefix
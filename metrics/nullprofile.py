@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+# Columns blank counts are broken down by
+PROFILE_DIMENSIONS = ['Year Month', 'First Captured Username']
+
+class NullProfile:
+    """
+    Which records are blank in each column of a frame, as one packed bitmap per
+    column (one bit per record) built in a single pass, with the month and
+    collector of each record as integer codes. Blank counts per month, per
+    collector or both, for any column, and co-missingness patterns across
+    columns are then counted from the bitmaps without the frame. blank_counts is
+    laid out like calculate_blank_counts, so calculate_blank_metrics_from_counts
+    turns it into the blank metrics frame.
+    """
+
+    def __init__(self, df, columns=None, dimensions=None):
+        self.dimensions = [column for column in (PROFILE_DIMENSIONS if dimensions is None else dimensions) if column in df.columns]
+        if columns is None:
+            columns = df.columns
+
+        self.rows = len(df)
+        self.columns = list(columns)
+        self.bitmaps = {column: np.packbits(df[column].isna().to_numpy()) for column in self.columns}
+
+        # Missing dimension values get a code of their own, as groupby with dropna=False
+        self.codes = {}
+        self.labels = {}
+        for dimension in self.dimensions:
+            codes, labels = pd.factorize(df[dimension], use_na_sentinel=False)
+            self.codes[dimension] = codes.astype(np.int32)
+            self.labels[dimension] = labels
+
+    def blanks(self, column):
+        """
+        The blank mask of a column, as a boolean array over the records.
+        """
+        return np.unpackbits(self.bitmaps[column], count=self.rows).view(bool)
+
+    def blank_counts(self, by=['Year Month'], columns=None):
+        """
+        Records and blanks per group of the dimensions in by (in order of first
+        appearance) and column, laid out like calculate_blank_counts.
+        """
+        columns = self.columns if columns is None else columns
+        groups, ids = self._groups(by)
+        sizes = np.bincount(ids, minlength=len(groups))
+        blanks = np.column_stack([np.bincount(ids[self.blanks(column)], minlength=len(groups)) for column in columns]) if columns else np.zeros((len(groups), 0), dtype=np.int64)
+
+        counts = groups.loc[groups.index.repeat(len(columns))].reset_index(drop=True)
+        counts['Field'] = np.tile(np.array(columns, dtype=object), len(groups))
+        counts['Total Records'] = np.repeat(sizes, len(columns))
+        counts['Blanks'] = blanks.ravel()
+
+        return counts
+
+    def all_blank_counts(self, columns, by=['Year Month']):
+        """
+        Records with every one of columns blank, per group, laid out like
+        blank_counts with the columns joined by ' & ' as the 'Field'.
+        """
+        groups, ids = self._groups(by)
+        all_blank = np.bitwise_and.reduce([self.bitmaps[column] for column in columns])
+
+        counts = groups.copy()
+        counts['Field'] = ' & '.join(columns)
+        counts['Total Records'] = np.bincount(ids, minlength=len(groups))
+        counts['Blanks'] = np.bincount(ids[np.unpackbits(all_blank, count=self.rows).view(bool)], minlength=len(groups))
+
+        return counts
+
+    def patterns(self, columns, by=None):
+        """
+        How many records share each combination of blank (True) and filled (False)
+        columns, per group of the dimensions in by (or over all records), most
+        common first within each group, with their share of the group's records.
+        """
+        groups, ids = self._groups(by or [])
+        pattern = np.zeros(self.rows, dtype=np.int64)
+        for bit, column in enumerate(columns):
+            pattern |= self.blanks(column).astype(np.int64) << bit
+
+        combined = ids.astype(np.int64) << len(columns) | pattern
+        values, records = np.unique(combined, return_counts=True)
+        group_ids = values >> len(columns)
+
+        result = groups.iloc[group_ids].reset_index(drop=True)
+        for bit, column in enumerate(columns):
+            result[column] = (values >> bit) & 1 == 1
+        result['Records'] = records
+        result['Percentage'] = records / np.bincount(ids, minlength=len(groups))[group_ids] * 100
+
+        result = result.assign(_group=group_ids).sort_values(['_group', 'Records'], ascending=[True, False], kind='stable')
+        return result.drop(columns='_group').reset_index(drop=True)
+
+    def _groups(self, by):
+        # One row of dimension values per group, and each record's group number
+        if not by:
+            return pd.DataFrame(index=range(1)), np.zeros(self.rows, dtype=np.intp)
+
+        combined = np.zeros(self.rows, dtype=np.int64)
+        for dimension in by:
+            combined = combined * len(self.labels[dimension]) + self.codes[dimension]
+        ids, _ = pd.factorize(combined)
+        first = np.unique(ids, return_index=True)[1]
+
+        groups = pd.DataFrame({dimension: self.labels[dimension].take(self.codes[dimension][first]) for dimension in by})
+        return groups, ids
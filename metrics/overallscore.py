@@ -1,7 +1,9 @@
 import pandas as pd
 
 from metrics.convert_percentage_to_scale import convert_percentage_to_scale
-from metrics.dataquality import calculate_data_quality_metrics, calculate_average_metrics
+from metrics.fieldcounts import calculate_field_counts, calculate_group_metrics
+from metrics.profiling import timed
+from metrics.ruleplan import rule_plan
 
 def calculate_overall_score(completeness_score, validity_score, integrity_score):
     # # Convert percentage scores to the specified scale
@@ -30,61 +32,37 @@ def calculate_overall_score(completeness_score, validity_score, integrity_score)
 
     return overall_score
 
-def calculate_overall_score_mom(df):
-    overall_scores = []
-    
-    df = df.sort_values('Year Month')
-
-    for _, group in df.groupby('Year Month'):
-        metrics_list = []
-
-        # Calculate metrics for each key field
-        key_fields = ['SLRN', 'Account Number', 'Meter Number', 'Meter SLRN', 'Phone Number', 'Email']
-        
-        slrn_prefix = {
-			'ecg_prefix': 'ECGBD',
-			'aedc_prefix': 'AEDCBD',
-            'yedc_prefix': 'YEDCBD'
-		}
-
-        for field_name in key_fields:
-            if field_name in df.columns:
-                if field_name in ['SLRN', 'Account Number', 'Meter Number']:
-                    if slrn_prefix['ecg_prefix'] == 'ECGBD':
-                        metrics = calculate_data_quality_metrics(group, field_name, 'ECGBD', 12, 'ECGCR', 11)
-                    elif slrn_prefix['yedc_prefix'] == 'YEDCBD':
-                        metrics = calculate_data_quality_metrics(group, field_name, 'YEDCBD', 13)
-                    elif slrn_prefix['aedc_prefix'] == 'AEDCBD':
-                        metrics = calculate_data_quality_metrics(group, field_name, 'AEDCBD', 13)
-                    metrics_list.append(metrics)
-                elif field_name == 'Meter SLRN':
-                    if slrn_prefix['ecg_prefix'] == 'ECGBD':
-                        metrics = calculate_data_quality_metrics(group, field_name, 'ECGBD', 12, 'ECGCR', 11)
-                        metrics_list.append(metrics)
-                elif field_name == 'Phone Number':
-                    if slrn_prefix['ecg_prefix'] == 'ECGBD':
-                        metrics = calculate_data_quality_metrics(group, field_name, 'ECGBD', 12, 'ECGCR', 11)
-                    elif slrn_prefix['aedc_prefix'] == 'AEDCBD':
-                        metrics = calculate_data_quality_metrics(group, field_name, 'AEDCBD', 13)
-                    elif slrn_prefix['yedc_prefix'] == 'YEDCBD':
-                        metrics = calculate_data_quality_metrics(group, field_name, 'YEDCBD', 13)
-                    metrics_list.append(metrics)
-                elif field_name == 'Email':
-                    metrics = calculate_data_quality_metrics(group, field_name, 'ECGBD', 12, 'ECGCR', 11)
-                    metrics_list.append(metrics)
+def calculate_overall_score_mom(df, plan=None):
+    # Without a plan every key field is scored with the ECG rules
+    if plan is None:
+        plan = rule_plan('ECG')
 
-        average_completeness = calculate_average_metrics(metrics_list, 'Completeness')
-        average_validity = calculate_average_metrics(metrics_list, 'Validity')
-        average_integrity = calculate_average_metrics(metrics_list, 'Integrity')
-
-        # Calculate overall score using the calculate_overall_score function
-        overall_score = calculate_overall_score(average_completeness, average_validity, average_integrity)
-        
-        overall_scores.append({'Year Month': group['Year Month'].iloc[0], 'Overall Score': overall_score})
+    df = df.sort_values('Year Month')
 
-    overall_scores_df = pd.DataFrame(overall_scores)
+    # Score every month from one pass over the row-level masks
+    with timed('calculate_overall_score_mom', len(df)):
+        key_fields = plan.fields(df)
+        counts = calculate_field_counts(df, key_fields, ['Year Month'], plan=plan)
+        overall_scores_df = calculate_overall_score_mom_from_counts(counts, key_fields)
     
     # Merge MoM overall scores back to the original DataFrame
     df = df.merge(overall_scores_df, on='Year Month', how='left')
 
     return df
+
+def calculate_overall_score_mom_from_counts(counts, key_fields):
+    """
+    The monthly 'Overall Score' from field counts grouped by 'Year Month',
+    one row per month in order of first appearance.
+    """
+    monthly_metrics = calculate_group_metrics(counts, key_fields, ['Year Month']).drop_duplicates(subset=['Year Month'])
+
+    # Calculate overall score using the calculate_overall_score function
+    return pd.DataFrame({
+        'Year Month': monthly_metrics['Year Month'].to_numpy(),
+        'Overall Score': calculate_overall_score(
+            monthly_metrics['Average Completeness'].to_numpy(),
+            monthly_metrics['Average Validity'].to_numpy(),
+            monthly_metrics['Average Integrity'].to_numpy()
+        )
+    })
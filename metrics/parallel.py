@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from metrics.dataquality import KEY_FIELDS
+from metrics.datacollectorscore import calculate_quality_score_by_collector_from_counts
+from metrics.feature_calculations import calculate_metrics_by_month_from_counts
+from metrics.fieldcounts import calculate_field_counts, merge_field_counts
+from metrics.overallscore import calculate_overall_score_mom_from_counts
+from metrics.ruleplan import rule_plan
+
+# Fewer rows than this per worker are scored faster than a process pool starts
+PARTITION_MIN_ROWS = 50000
+
+# The frame being scored, inherited by the forked workers instead of being pickled to them
+_partition_frame = None
+
+def score_partitions(df, key_fields, group_by, bd_slrn=None, bdslrn_len=None, meter_slrn=None, mslrn_len=None, workers=None, plan=None):
+    """
+    calculate_field_counts of a prepared frame, computed in a process pool.
+    The frame is split into one contiguous block of rows per worker. This
+    process counts the first block, and forked workers, which inherit the frame,
+    count one other block each, so no rows are pickled. The blocks are merged in
+    row order, which keeps groups in the order the serial scorers produce them.
+    Scoring stays in this process when fork is unavailable, when there is only
+    one CPU to use, or when the blocks would have fewer than PARTITION_MIN_ROWS
+    rows.
+    """
+    if plan is not None:
+        bd_slrn, bdslrn_len, meter_slrn, mslrn_len = plan.rule_params
+    rule_params = (bd_slrn, bdslrn_len, meter_slrn, mslrn_len)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, _available_cpus(), len(df) // PARTITION_MIN_ROWS)
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return calculate_field_counts(df, key_fields, group_by, *rule_params)
+
+    bounds = np.linspace(0, len(df), workers + 1).astype(int)
+    global _partition_frame
+    _partition_frame = df
+    try:
+        with ProcessPoolExecutor(max_workers=workers - 1, mp_context=multiprocessing.get_context('fork')) as executor:
+            partials = executor.map(_score_partition, bounds[1:-1], bounds[2:], [key_fields] * (workers - 1), [group_by] * (workers - 1), [rule_params] * (workers - 1))
+            # This process counts the first block while the workers count the rest
+            counts_list = [_score_partition(bounds[0], bounds[1], key_fields, group_by, rule_params)]
+            counts_list.extend(partials)
+    finally:
+        _partition_frame = None
+
+    return merge_field_counts(counts_list, group_by)
+
+def calculate_metrics_by_month_parallel(df, key_fields=None, bd_slrn=None, bdslrn_len=None, meter_slrn=None, mslrn_len=None, workers=None, plan=None):
+    """
+    calculate_metrics_by_month computed with score_partitions.
+    """
+    # Without a plan or rule parameters every key field is scored with the ECG rules
+    if plan is None and bd_slrn is None:
+        plan = rule_plan('ECG')
+    if key_fields is None:
+        key_fields = KEY_FIELDS if plan is None else plan.key_fields
+    key_fields = [field_name for field_name in key_fields if field_name in df.columns]
+
+    counts = score_partitions(df, key_fields, ['Year Month'], bd_slrn, bdslrn_len, meter_slrn, mslrn_len, workers, plan)
+    unique_meter_count = df.groupby('Year Month', sort=False, observed=True)['Meter Number'].nunique()
+    return calculate_metrics_by_month_from_counts(counts, key_fields, unique_meter_count)
+
+def calculate_overall_score_mom_parallel(df, workers=None, plan=None):
+    """
+    calculate_overall_score_mom computed with score_partitions.
+    """
+    # Without a plan every key field is scored with the ECG rules, as in calculate_overall_score_mom
+    if plan is None:
+        plan = rule_plan('ECG')
+
+    df = df.sort_values('Year Month')
+
+    key_fields = plan.fields(df)
+    counts = score_partitions(df, key_fields, ['Year Month'], workers=workers, plan=plan)
+    overall_scores_df = calculate_overall_score_mom_from_counts(counts, key_fields)
+
+    return df.merge(overall_scores_df, on='Year Month', how='left')
+
+def calculate_quality_score_by_collector_parallel(df, field_metrics, weights=None, formatted=True, workers=None, plan=None):
+    """
+    calculate_quality_score_by_collector computed with score_partitions.
+    """
+    # Without a plan every key field is scored with the ECG rules, as in calculate_quality_score_by_collector
+    if plan is None:
+        plan = rule_plan('ECG')
+
+    key_fields = plan.fields(df)
+    counts = score_partitions(df, key_fields, ['First Captured Username'], workers=workers, plan=plan)
+    return calculate_quality_score_by_collector_from_counts(counts, key_fields, weights, formatted)
+
+def _available_cpus():
+    # CPUs this process may run on, which can be fewer than os.cpu_count()
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def _score_partition(start, stop, key_fields, group_by, rule_params):
+    # In a forked worker, the frame is the one this module held when the pool started
+    return calculate_field_counts(_partition_frame.iloc[start:stop], key_fields, group_by, *rule_params)
@@ -0,0 +1,112 @@
+import statistics
+
+import numpy as np
+import pandas as pd
+
+from metrics.dataquality import KEY_FIELDS, RuleMaskCache
+from metrics.overallscore import calculate_overall_score
+from metrics.ruleplan import rule_plan
+
+# Records are sampled separately within each month and collector
+SAMPLE_STRATA = ['Year Month', 'First Captured Username']
+
+PREVIEW_METRICS = ['Average Completeness', 'Average Validity', 'Average Integrity', 'Overall Score']
+
+def stratified_sample(df, error=1.0, confidence=0.95, by=['Year Month'], seed=None):
+    """
+    A random sample of df large enough to estimate any score of each group of by
+    (a percentage) within error points at the given confidence, drawn separately
+    from every month and collector in proportion to its records. Every stratum
+    keeps at least two records, or all of them.
+    """
+    sample, _, _ = _draw(df, error, confidence, by, seed)
+    return sample
+
+def preview_scores(df, error=1.0, confidence=0.95, key_fields=None, plan=None, by=['Year Month'], seed=None):
+    """
+    Approximate 'Average Completeness', 'Average Validity', 'Average Integrity'
+    and 'Overall Score' for each group of by, scored on a stratified_sample of df
+    instead of every record. Each comes with the '<metric> Lower' and
+    '<metric> Upper' bounds of its confidence interval, which stay within about
+    error points either side. Groups with a missing value are left out. Without a plan
+    the ECG rules are used.
+    """
+    if plan is None:
+        plan = rule_plan('ECG')
+    key_fields = plan.fields(df) if key_fields is None else [field_name for field_name in key_fields if field_name in df.columns]
+
+    sample, strata, sizes = _draw(df, error, confidence, by, seed)
+    scores = _record_scores(sample, key_fields, plan)
+
+    # Stratified mean of every score, and its variance with the finite population correction
+    scores['_stratum'] = strata
+    grouped = scores.groupby('_stratum', sort=True)
+    means = grouped[PREVIEW_METRICS].mean()
+    variances = grouped[PREVIEW_METRICS].var(ddof=1).fillna(0)
+    sampled = grouped.size()
+
+    population = sizes.iloc[means.index]
+    groups = population.index.droplevel([column for column in population.index.names if column not in by]).to_frame(index=False)
+    weights = population.to_numpy() / population.groupby(level=by, sort=False, dropna=False).transform('sum').to_numpy()
+    correction = 1 - sampled.to_numpy() / population.to_numpy()
+
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    terms = pd.DataFrame({'Records': population.to_numpy(), 'Sampled': sampled.to_numpy()})
+    for metric in PREVIEW_METRICS:
+        terms[metric] = weights * means[metric].to_numpy()
+        terms[f'_{metric} Variance'] = weights ** 2 * correction * variances[metric].to_numpy() / sampled.to_numpy()
+
+    result = pd.concat([groups, terms], axis=1).groupby(by, sort=False, dropna=False).sum().reset_index()
+    result = result[result[by].notna().all(axis=1)]
+
+    for metric in PREVIEW_METRICS:
+        margin = z * np.sqrt(result.pop(f'_{metric} Variance'))
+        result[f'{metric} Lower'] = (result[metric] - margin).clip(lower=0)
+        result[f'{metric} Upper'] = (result[metric] + margin).clip(upper=100)
+
+    return result.sort_values(by, kind='stable', ignore_index=True)
+
+def _draw(df, error, confidence, by, seed):
+    # The sample, each sampled record's stratum number and the records of every stratum
+    strata_columns = list(by) + [column for column in SAMPLE_STRATA if column not in by and column in df.columns]
+    combined = np.zeros(len(df), dtype=np.int64)
+    for column in strata_columns:
+        # Missing values form strata of their own
+        codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+        combined = combined * len(uniques) + codes
+    strata, _ = pd.factorize(combined)
+    first = np.unique(strata, return_index=True)[1]
+    labels = pd.MultiIndex.from_frame(df[strata_columns].iloc[first].reset_index(drop=True))
+    sizes = pd.Series(np.bincount(strata, minlength=len(first)), index=labels)
+
+    # Records each group of by needs for a proportion within error points, shared out over its strata
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    required = (z * 0.5 / (error / 100)) ** 2
+    group_sizes = sizes.groupby(level=list(by), sort=False, dropna=False).transform('sum').to_numpy()
+    group_sample_sizes = required / (1 + (required - 1) / group_sizes)
+    sample_sizes = np.minimum(sizes.to_numpy(), np.maximum(np.ceil(group_sample_sizes * sizes.to_numpy() / group_sizes), 2))
+
+    # Keep the first sample_sizes records of each stratum in a random order
+    order = np.random.default_rng(seed).permutation(len(df))
+    rank = pd.Series(strata[order]).groupby(strata[order]).cumcount().to_numpy()
+    keep = np.sort(order[rank < sample_sizes[strata[order]]])
+
+    return df.iloc[keep], strata[keep], sizes
+
+def _record_scores(df, key_fields, plan):
+    # Each record's share of complete, valid and integrity fields; averaged over records
+    # these are the Average Completeness, Validity and Integrity of the full scorers
+    cache = RuleMaskCache(df)
+    totals = {metric: np.zeros(len(df)) for metric in PREVIEW_METRICS[:3]}
+    for field_name in key_fields:
+        if field_name not in KEY_FIELDS:
+            # Fields without rules score zero
+            continue
+        totals['Average Completeness'] += cache.complete(field_name).to_numpy()
+        totals['Average Validity'] += cache.validity(field_name, *plan.rule_params).to_numpy()
+        totals['Average Integrity'] += cache.integrity(field_name, plan.slrn_prefix, corresponding_meter_field='Meter Number').to_numpy()
+
+    scores = pd.DataFrame({metric: total / len(key_fields) * 100 for metric, total in totals.items()})
+    scores['Overall Score'] = calculate_overall_score(scores['Average Completeness'], scores['Average Validity'], scores['Average Integrity'])
+
+    return scores
@@ -0,0 +1,130 @@
+import contextlib
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+
+# The active Profiler, if any; instrumented code only checks this while profiling is off
+_profiler = None
+_DISABLED = contextlib.nullcontext()
+
+class Profiler:
+    """
+    Wall time, rows processed and (optionally) peak traced memory of the
+    instrumented steps run while it is active. Spans with the same name and
+    labels are aggregated.
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.spans = {}
+        self._stack = []
+
+    @contextlib.contextmanager
+    def span(self, name, rows=None, labels=None):
+        labels = tuple(sorted((labels or {}).items()))
+        if self.memory:
+            self._enter_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = self._exit_memory() if self.memory else None
+            self._add(name, labels, seconds, rows, peak)
+
+    def report(self):
+        """
+        One dict per distinct span: name, labels, calls, seconds, rows,
+        rows_per_second and peak_mb (None unless memory was traced).
+        """
+        entries = []
+        for (name, labels), span in self.spans.items():
+            entries.append({
+                'name': name,
+                'labels': dict(labels),
+                'calls': span['calls'],
+                'seconds': span['seconds'],
+                'rows': span['rows'],
+                'rows_per_second': span['rows'] / span['seconds'] if span['rows'] and span['seconds'] else None,
+                'peak_mb': None if span['peak'] is None else span['peak'] / 2 ** 20
+            })
+
+        return sorted(entries, key=lambda entry: entry['seconds'], reverse=True)
+
+    def write_json(self, path):
+        with open(path, 'w') as output:
+            json.dump(self.report(), output, indent=2)
+
+    def summary(self):
+        """
+        The report as a DataFrame, slowest spans first, with each span's labels
+        joined into one 'Labels' column.
+        """
+        summary = pd.DataFrame(self.report(), columns=['name', 'labels', 'calls', 'seconds', 'rows', 'rows_per_second', 'peak_mb'])
+        summary['labels'] = summary['labels'].map(lambda labels: ', '.join(f'{key}={value}' for key, value in labels.items()))
+        summary.columns = ['Step', 'Labels', 'Calls', 'Seconds', 'Rows', 'Rows/sec', 'Peak MB']
+
+        return summary
+
+    def _add(self, name, labels, seconds, rows, peak):
+        span = self.spans.setdefault((name, labels), {'calls': 0, 'seconds': 0.0, 'rows': 0, 'peak': None})
+        span['calls'] += 1
+        span['seconds'] += seconds
+        span['rows'] += rows or 0
+        if peak is not None:
+            span['peak'] = peak if span['peak'] is None else max(span['peak'], peak)
+
+    def _enter_memory(self):
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            # Keep the enclosing span's peak before resetting it for this one
+            self._stack[-1]['child_peak'] = max(self._stack[-1]['child_peak'], peak)
+        tracemalloc.reset_peak()
+        self._stack.append({'start': current, 'child_peak': current})
+
+    def _exit_memory(self):
+        frame = self._stack.pop()
+        peak = max(tracemalloc.get_traced_memory()[1], frame['child_peak'])
+        if self._stack:
+            self._stack[-1]['child_peak'] = max(self._stack[-1]['child_peak'], peak)
+
+        return peak - frame['start']
+
+@contextlib.contextmanager
+def profile(memory=False):
+    """
+    Profile the instrumented metrics steps run inside the block:
+
+        with profile(memory=True) as profiler:
+            calculate_metrics_by_month(df, key_fields, 'ECGBD', 12, 'ECGCR', 11)
+        print(profiler.summary())
+
+    Tracing memory slows the code down noticeably; timings are only
+    representative with memory=False.
+    """
+    global _profiler
+
+    previous = _profiler
+    profiler = Profiler(memory)
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    _profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _profiler = previous
+        if started_tracing:
+            tracemalloc.stop()
+
+def timed(name, rows=None, **labels):
+    """
+    Context manager recording a span on the active profiler; a shared no-op
+    context when profiling is off.
+    """
+    if _profiler is None:
+        return _DISABLED
+    return _profiler.span(name, rows, labels)
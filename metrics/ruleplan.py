@@ -0,0 +1,94 @@
+from metrics.dataquality import KEY_FIELDS
+
+# Rule parameters and scored fields of each utility's CAIMS extract
+UTILITY_PROFILES = {
+    'ECG': {'slrn_prefix': 'ECGBD', 'slrn_length': 12, 'meter_prefix': 'ECGCR', 'meter_length': 11, 'key_fields': KEY_FIELDS},
+    'AEDC': {'slrn_prefix': 'AEDCBD', 'slrn_length': 13, 'key_fields': ['SLRN', 'Account Number', 'Meter Number', 'Phone Number', 'Email']},
+    'YEDC': {'slrn_prefix': 'YEDCBD', 'slrn_length': 13, 'key_fields': ['SLRN', 'Account Number', 'Meter Number', 'Phone Number', 'Email']}
+}
+
+# Columns each field's integrity rule reads besides the field itself
+INTEGRITY_DEPENDENCIES = {
+    'SLRN': ['Meter Number', 'Account Number'],
+    'Account Number': ['SLRN', 'Meter Number'],
+    'Meter Number': ['Meter Status', 'SLRN'],
+    'Meter SLRN': ['SLRN', 'Meter Number'],
+    'Phone Number': ['Meter Number', 'Account Number'],
+    'Email': ['Meter Number', 'Account Number']
+}
+
+_plans = {}
+
+class RulePlan:
+    """
+    The rules of one utility profile resolved once: the SLRN and meter SLRN
+    parameters in the order the scorers take them (rule_params), the fields to
+    score and the columns each field's rules read. Pass it to the scorers as
+    plan= instead of repeating the prefix and length arguments.
+    """
+
+    def __init__(self, utility, slrn_prefix, slrn_length, meter_prefix=None, meter_length=None, key_fields=None):
+        self.utility = utility
+        self.slrn_prefix = slrn_prefix
+        self.slrn_length = slrn_length
+        self.meter_prefix = meter_prefix
+        self.meter_length = meter_length
+        self.key_fields = list(KEY_FIELDS if key_fields is None else key_fields)
+        self.rule_params = (slrn_prefix, slrn_length, meter_prefix, meter_length)
+
+        if 'Meter SLRN' in self.key_fields and meter_prefix is None:
+            raise ValueError(f"Utility {utility} scores 'Meter SLRN' but has no meter SLRN prefix")
+
+        self.dependencies = {}
+        for field_name in self.key_fields:
+            if field_name not in KEY_FIELDS:
+                continue
+            dependencies = INTEGRITY_DEPENDENCIES[field_name]
+            if field_name == 'Account Number' and slrn_prefix in ['YEDCBD', 'AEDCBD']:
+                dependencies = ['SLRN', 'Meter Status']
+            self.dependencies[field_name] = [field_name] + dependencies
+
+    def __repr__(self):
+        return f'RulePlan({self.utility!r}, {self.slrn_prefix!r}, {self.slrn_length!r}, {self.meter_prefix!r}, {self.meter_length!r})'
+
+    def fields(self, df):
+        """
+        The plan's key fields present in df, in plan order.
+        """
+        return [field_name for field_name in self.key_fields if field_name in df.columns]
+
+    def required_columns(self):
+        """
+        Every column the plan's rules read.
+        """
+        columns = []
+        for field_name in self.key_fields:
+            for column in self.dependencies.get(field_name, [field_name]):
+                if column not in columns:
+                    columns.append(column)
+
+        return columns
+
+def register_utility(utility, slrn_prefix, slrn_length, meter_prefix=None, meter_length=None, key_fields=None):
+    """
+    Add or replace a utility profile and return its compiled RulePlan.
+    """
+    plan = RulePlan(utility, slrn_prefix, slrn_length, meter_prefix, meter_length, key_fields)
+    UTILITY_PROFILES[utility] = {
+        'slrn_prefix': slrn_prefix, 'slrn_length': slrn_length,
+        'meter_prefix': meter_prefix, 'meter_length': meter_length, 'key_fields': plan.key_fields
+    }
+    _plans[utility] = plan
+
+    return plan
+
+def rule_plan(utility):
+    """
+    The RulePlan of a registered utility, compiled on first use.
+    """
+    if utility not in _plans:
+        if utility not in UTILITY_PROFILES:
+            raise KeyError(f'Unknown utility {utility!r}; register it with register_utility')
+        _plans[utility] = RulePlan(utility, **UTILITY_PROFILES[utility])
+
+    return _plans[utility]
@@ -0,0 +1,275 @@
+import functools
+import re
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from metrics.datacollectorscore import calculate_quality_score_by_collector_from_counts
+from metrics.dataquality import EMAIL_PATTERN, EMAIL_PLACEHOLDER_PATTERN, KEY_FIELDS, METER_NUMBER_FORMAT_PATTERN, METER_NUMBER_LETTERS_PATTERN, VALID_PHONE_NUMBER_PATTERN, preprocess_meter_numbers, preprocess_phone_numbers, re2_pattern
+from metrics.feature_calculations import calculate_metrics_by_month_from_counts
+from metrics.fieldcounts import merge_field_counts
+from metrics.loader import TEXT_COLUMNS, prepare_extract, read_extract
+from metrics.overallscore import calculate_overall_score_mom_from_counts
+from metrics.ruleplan import rule_plan
+from metrics.streaming import PARTITION_COLUMNS
+
+# Extract columns loaded into the engine, and the preprocessed values the validity rules read
+STORED_COLUMNS = PARTITION_COLUMNS + KEY_FIELDS + ['Meter Status']
+PROCESSED_COLUMNS = {'Meter Number': 'Meter Number Processed', 'Phone Number': 'Phone Number Processed'}
+
+class SqlScorer:
+    """
+    Score extracts inside an embedded SQL engine instead of in pandas memory.
+    load streams CSV or Parquet extracts chunk by chunk into an 'extract' table,
+    in DuckDB if it is installed (or engine='duckdb') and SQLite otherwise, at
+    path (in memory if None). The completeness, validity and integrity rules of
+    the plan (ECG without one) run as one SQL aggregation, so data larger than
+    memory is grouped, spilled and parallelized by the engine; only the counts per
+    month and collector come back to pandas. Meter and phone numbers are
+    preprocessed while loading, as the scorers do before validating.
+
+    The SQLite engine evaluates the validity patterns through a Python function
+    called once per record, so it loads and scores several times slower than the
+    pandas scorers. It is a fallback for extracts that do not fit in memory, giving
+    the same results, not a faster scorer.
+    """
+
+    def __init__(self, path=None, plan=None, engine=None):
+        if plan is None:
+            plan = rule_plan('ECG')
+        if engine is None:
+            engine = 'duckdb' if _import_duckdb(required=False) is not None else 'sqlite'
+
+        self.plan = plan
+        self.engine = engine
+        if engine == 'duckdb':
+            self.connection = _import_duckdb().connect(path or ':memory:')
+        elif engine == 'sqlite':
+            self.connection = sqlite3.connect(path or ':memory:')
+            self.connection.create_function('regexp', 2, _regexp, deterministic=True)
+        else:
+            raise ValueError(f"Unknown engine {engine!r}; use 'duckdb' or 'sqlite'")
+
+        self.columns = self._table_columns()
+        self.rows = self.connection.execute('SELECT COUNT(*) FROM extract').fetchone()[0] if self.columns else 0
+        self._counts = None
+
+    def close(self):
+        self.connection.close()
+
+    def load(self, paths, slrn_prefix=None, chunksize=500000):
+        """
+        Append raw extract CSVs (or .parquet files), prepared as read_extract does,
+        to the extract table. Peak memory is bounded by the chunk size.
+        """
+        for path in paths:
+            if str(path).endswith('.parquet'):
+                chunks = _read_parquet(path, slrn_prefix, chunksize)
+            else:
+                chunks = read_extract(path, slrn_prefix, chunksize=chunksize)
+            for chunk in chunks:
+                self._append(chunk)
+
+        return self
+
+    def field_counts(self):
+        """
+        Total, complete, valid and integrity records per month, collector and key
+        field, laid out like calculate_field_counts with dropna=False, groups in
+        order of first appearance. The counts are computed once per set of loaded
+        records.
+        """
+        if self._counts is not None:
+            return self._counts
+
+        fields = self.scored_fields()
+        expressions = []
+        for field_name in fields:
+            complete = f'{_quote(field_name)} IS NOT NULL'
+            expressions += [complete, f'({self._validity(field_name)}) AND {complete}', f'({self._integrity(field_name)}) AND {complete}']
+
+        group_columns = ', '.join(_quote(column) for column in PARTITION_COLUMNS)
+        measures = ''.join(f', SUM(CASE WHEN {expression} THEN 1 ELSE 0 END)' for expression in expressions)
+        rows = self.connection.execute(
+            f'SELECT {group_columns}, COUNT(*){measures} FROM extract GROUP BY {group_columns} ORDER BY MIN(ordinal)'
+        ).fetchall()
+
+        groups = pd.DataFrame([row[:len(PARTITION_COLUMNS)] for row in rows], columns=PARTITION_COLUMNS, dtype=object)
+        groups['Year Month'] = _periods(groups['Year Month'])
+        sums = np.array([row[len(PARTITION_COLUMNS):] for row in rows], dtype=np.int64).reshape(len(rows), 1 + 3 * len(fields))
+
+        counts = groups.loc[groups.index.repeat(len(fields))].reset_index(drop=True)
+        counts['Key fields'] = np.tile(np.array(fields, dtype=object), len(groups))
+        counts['Total Records'] = np.repeat(sums[:, 0], len(fields))
+        for number, measure in enumerate(['Complete', 'Valid', 'Integrity']):
+            counts[measure] = sums[:, 1 + number::3].ravel()
+
+        self._counts = counts
+        return counts
+
+    def unique_meter_count(self):
+        """
+        The number of distinct meter numbers per month, indexed by 'Year Month'.
+        """
+        rows = self.connection.execute(
+            'SELECT "Year Month", COUNT(DISTINCT "Meter Number") FROM extract WHERE "Year Month" IS NOT NULL GROUP BY "Year Month"'
+        ).fetchall()
+        return pd.Series([count for _, count in rows], index=_periods(pd.Series([year_month for year_month, _ in rows], dtype=object)), dtype='int64')
+
+    def metrics_by_month(self, key_fields=None):
+        """
+        The calculate_metrics_by_month result for the loaded records.
+        """
+        counts = merge_field_counts([self.field_counts()], ['Year Month'])
+        counts = counts[counts['Year Month'].notna()]
+        key_fields = self.scored_fields() if key_fields is None else [field_name for field_name in key_fields if field_name in self.columns]
+
+        return calculate_metrics_by_month_from_counts(counts, key_fields, self.unique_meter_count())
+
+    def overall_score_mom(self):
+        """
+        The monthly 'Overall Score' of calculate_overall_score_mom, one row per month.
+        """
+        counts = merge_field_counts([self.field_counts()], ['Year Month'])
+        overall_scores_df = calculate_overall_score_mom_from_counts(counts[counts['Year Month'].notna()], self.scored_fields())
+
+        return overall_scores_df.sort_values('Year Month', kind='stable', ignore_index=True)
+
+    def quality_score_by_collector(self, weights=None, formatted=True):
+        """
+        The calculate_quality_score_by_collector result for the loaded records.
+        """
+        counts = merge_field_counts([self.field_counts()], ['First Captured Username'])
+        counts = counts[counts['First Captured Username'].notna()]
+
+        return calculate_quality_score_by_collector_from_counts(counts, self.scored_fields(), weights, formatted)
+
+    def scored_fields(self):
+        return [field_name for field_name in self.plan.key_fields if field_name in self.columns and field_name in KEY_FIELDS]
+
+    def _validity(self, field_name):
+        slrn_prefix, slrn_length, meter_prefix, meter_length = self.plan.rule_params
+        value = _quote(field_name)
+
+        if field_name == 'SLRN':
+            return f'substr({value}, 1, {len(slrn_prefix)}) = {_literal(slrn_prefix)} AND length({value}) = {int(slrn_length)}'
+        elif field_name == 'Meter SLRN':
+            return f'substr({value}, 1, {len(meter_prefix)}) = {_literal(meter_prefix)} AND length({value}) >= {int(meter_length)}'
+        elif field_name == 'Account Number':
+            # validity_mask's `len >= 6 | notnull` compares the length against True on complete records
+            return f'length({value}) >= {1 if slrn_prefix in ["YEDCBD", "AEDCBD"] else 5}'
+        elif field_name == 'Meter Number':
+            processed = _quote(PROCESSED_COLUMNS[field_name])
+            return f'{self._matches(processed, METER_NUMBER_FORMAT_PATTERN)} AND {self._matches(processed, METER_NUMBER_LETTERS_PATTERN)}'
+        elif field_name == 'Phone Number':
+            return self._matches(_quote(PROCESSED_COLUMNS[field_name]), VALID_PHONE_NUMBER_PATTERN)
+        elif field_name == 'Email':
+            return f'{self._matches(value, EMAIL_PATTERN)} AND NOT {self._matches(value, "(?i)" + EMAIL_PLACEHOLDER_PATTERN)}'
+
+    def _integrity(self, field_name):
+        slrn_prefix = self.plan.slrn_prefix
+        complete = lambda column: f'{self._column(column)} IS NOT NULL'
+
+        if field_name == 'SLRN':
+            return f'({complete("SLRN")} AND {complete("Meter Number")} AND length({self._column("Meter Number")}) > 5) OR {complete("Account Number")}'
+        elif field_name == 'Meter SLRN':
+            return f'length({self._column("Meter SLRN")}) > 10 AND {complete("SLRN")} AND {complete("Meter Number")}'
+        elif field_name == 'Meter Number':
+            return f'{self._validity(field_name)} AND {self._column("Meter Status")} = {_literal("Metered")} AND {complete("SLRN")}'
+        elif field_name in ['Email', 'Phone Number']:
+            return f'{self._validity(field_name)} AND ({complete("Meter Number")} OR {complete("Account Number")})'
+        elif field_name == 'Account Number':
+            if slrn_prefix in ['YEDCBD', 'AEDCBD']:
+                return f'length({self._column(field_name)}) >= 1 AND ({complete("SLRN")} OR {complete("Meter Status")})'
+            return f'length({self._column(field_name)}) > 5 AND {complete("SLRN")} AND {complete("Meter Number")}'
+
+    def _matches(self, value, pattern):
+        if self.engine == 'duckdb':
+            # DuckDB matches with RE2
+            return f'regexp_matches({value}, {_literal(re2_pattern(pattern))})'
+        return f'{value} REGEXP {_literal(pattern)}'
+
+    def _column(self, column):
+        # Columns missing from the extracts read as blank
+        return _quote(column) if column in self.columns else 'NULL'
+
+    def _append(self, chunk):
+        if not self.columns:
+            self.columns = [column for column in STORED_COLUMNS if column in chunk.columns]
+            self.columns += [PROCESSED_COLUMNS[column] for column in PROCESSED_COLUMNS if column in self.columns]
+            definitions = ', '.join(f'{_quote(column)} VARCHAR' for column in self.columns)
+            self.connection.execute(f'CREATE TABLE extract (ordinal BIGINT, {definitions})')
+
+        frame = pd.DataFrame({'ordinal': np.arange(self.rows, self.rows + len(chunk))})
+        for column in self.columns:
+            if column == 'Year Month':
+                values = chunk[column].astype(str).where(chunk[column].notna())
+            elif column in PROCESSED_COLUMNS.values():
+                source = next(name for name, processed in PROCESSED_COLUMNS.items() if processed == column)
+                complete = chunk[source].notna()
+                preprocess = preprocess_meter_numbers if source == 'Meter Number' else preprocess_phone_numbers
+                values = preprocess(chunk[source][complete]).reindex(chunk.index)
+            else:
+                values = chunk[column]
+            frame[column] = values.astype(object).where(values.notna(), None).to_numpy()
+
+        if self.engine == 'duckdb':
+            self.connection.register('extract_chunk', frame)
+            self.connection.execute('INSERT INTO extract SELECT * FROM extract_chunk')
+            self.connection.unregister('extract_chunk')
+        else:
+            with self.connection:
+                placeholders = ', '.join('?' * len(frame.columns))
+                self.connection.executemany(f'INSERT INTO extract VALUES ({placeholders})', frame.itertuples(index=False, name=None))
+        self.rows += len(chunk)
+        self._counts = None
+
+    def _table_columns(self):
+        try:
+            cursor = self.connection.execute('SELECT * FROM extract LIMIT 0')
+        except Exception:
+            # No extract loaded yet (sqlite3.OperationalError or duckdb.CatalogException)
+            return []
+        return [description[0] for description in cursor.description if description[0] != 'ordinal']
+
+def _regexp(pattern, value):
+    # SQLite's `value REGEXP pattern`, with the re.match semantics of the anchored patterns
+    return value is not None and _compile(pattern).search(value) is not None
+
+@functools.lru_cache(maxsize=None)
+def _compile(pattern):
+    return re.compile(pattern)
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _periods(values):
+    return pd.PeriodIndex(values.where(values.notna(), None), freq='M')
+
+def _read_parquet(path, slrn_prefix, chunksize):
+    try:
+        import pyarrow.parquet as parquet
+    except ImportError as error:
+        raise ImportError('Loading Parquet extracts needs pyarrow (pip install pyarrow)') from error
+
+    for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunksize):
+        chunk = batch.to_pandas()
+        # Read identifiers as text, as read_extract does for CSVs
+        for column in TEXT_COLUMNS:
+            if column in chunk.columns:
+                chunk[column] = chunk[column].where(chunk[column].isna(), chunk[column].astype(str))
+        yield prepare_extract(chunk, slrn_prefix)
+
+def _import_duckdb(required=True):
+    try:
+        import duckdb
+    except ImportError as error:
+        if not required:
+            return None
+        raise ImportError('The DuckDB engine needs duckdb (pip install duckdb)') from error
+
+    return duckdb
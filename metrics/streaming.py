@@ -0,0 +1,126 @@
+import pandas as pd
+
+from metrics.datacollectorscore import calculate_quality_score_by_collector_from_counts
+from metrics.dataquality import RuleMaskCache
+from metrics.feature_calculations import calculate_blank_counts, calculate_blank_metrics_from_counts, calculate_metrics_by_month_from_counts
+from metrics.fieldcounts import calculate_field_counts, merge_field_counts
+from metrics.loader import read_extract
+from metrics.overallscore import calculate_overall_score_mom_from_counts
+from metrics.profiling import timed
+
+PARTITION_COLUMNS = ['Year Month', 'First Captured Username']
+
+class PartialAggregates:
+    """
+    Mergeable field counts per month, collector and key field, blank counts per
+    month and column, and the distinct meter numbers seen in each month. Memory
+    grows with months x collectors and distinct meters, not with the number of
+    rows scored. A ValidationMemo passed as memo is shared by every chunk.
+    """
+
+    def __init__(self, key_fields=None, bd_slrn=None, bdslrn_len=None, meter_slrn=None, mslrn_len=None, plan=None, memo=None):
+        # A RulePlan supplies the rule parameters, and the key fields unless given
+        if plan is not None:
+            bd_slrn, bdslrn_len, meter_slrn, mslrn_len = plan.rule_params
+            if key_fields is None:
+                key_fields = plan.key_fields
+
+        self.key_fields = key_fields
+        self.rule_params = (bd_slrn, bdslrn_len, meter_slrn, mslrn_len)
+        self.columns = None
+        self.counts = None
+        self.blank_counts = None
+        self.meter_numbers = {}
+        self.memo = memo
+
+    def update(self, df):
+        """
+        Add the counts for a prepared chunk of records.
+        """
+        if self.columns is None:
+            self.columns = list(df.columns)
+
+        with timed('PartialAggregates.update', len(df)):
+            counts = calculate_field_counts(df, self.key_fields, PARTITION_COLUMNS, *self.rule_params, cache=RuleMaskCache(df, self.memo), dropna=False)
+            self.add_counts(counts)
+            self.add_blank_counts(calculate_blank_counts(df))
+
+            months = df.dropna(subset=['Year Month', 'Meter Number']).groupby('Year Month', sort=False, observed=True)['Meter Number']
+            for year_month, meter_numbers in months:
+                self.meter_numbers.setdefault(year_month, set()).update(meter_numbers.unique())
+
+        return self
+
+    def merge(self, other):
+        """
+        Fold another PartialAggregates over disjoint records into this one.
+        """
+        if self.columns is None:
+            self.columns = other.columns
+        if other.counts is not None:
+            self.add_counts(other.counts)
+        if other.blank_counts is not None:
+            self.add_blank_counts(other.blank_counts)
+        for year_month, meter_numbers in other.meter_numbers.items():
+            self.meter_numbers.setdefault(year_month, set()).update(meter_numbers)
+
+        return self
+
+    def month_counts(self):
+        counts = merge_field_counts([self.counts], ['Year Month'])
+        return counts[counts['Year Month'].notna()]
+
+    def collector_counts(self):
+        counts = merge_field_counts([self.counts], ['First Captured Username'])
+        return counts[counts['First Captured Username'].notna()]
+
+    def metrics_by_month(self):
+        """
+        The calculate_metrics_by_month result for all records added so far.
+        """
+        unique_meter_count = pd.Series({year_month: len(meter_numbers) for year_month, meter_numbers in self.meter_numbers.items()}, dtype='int64')
+        return calculate_metrics_by_month_from_counts(self.month_counts(), self.scored_fields(), unique_meter_count)
+
+    def overall_score_mom(self):
+        """
+        The monthly 'Overall Score' of calculate_overall_score_mom, one row per month.
+        """
+        overall_scores_df = calculate_overall_score_mom_from_counts(self.month_counts(), self.scored_fields())
+        return overall_scores_df.sort_values('Year Month', kind='stable', ignore_index=True)
+
+    def quality_score_by_collector(self, weights=None, formatted=True):
+        """
+        The calculate_quality_score_by_collector result for all records added so far.
+        """
+        return calculate_quality_score_by_collector_from_counts(self.collector_counts(), self.scored_fields(), weights, formatted)
+
+    def blank_metrics(self, key_fields):
+        """
+        The calculate_blank_metrics result for all records added so far.
+        """
+        return calculate_blank_metrics_from_counts(self.blank_counts, [field_name for field_name in key_fields if field_name in self.columns])
+
+    def scored_fields(self):
+        return [field_name for field_name in self.key_fields if field_name in self.columns]
+
+    def add_counts(self, counts):
+        counts_list = [counts] if self.counts is None else [self.counts, counts]
+        self.counts = merge_field_counts(counts_list, PARTITION_COLUMNS)
+
+    def add_blank_counts(self, blank_counts):
+        if self.blank_counts is not None:
+            blank_counts = pd.concat([self.blank_counts, blank_counts], ignore_index=True)
+        self.blank_counts = blank_counts.groupby(['Year Month', 'Field'], sort=False, dropna=False)[['Total Records', 'Blanks']].sum().reset_index()
+
+def score_extracts(paths, key_fields=None, bd_slrn=None, bdslrn_len=None, meter_slrn=None, mslrn_len=None, slrn_prefix=None, chunksize=500000, plan=None, memo=None):
+    """
+    Stream raw extract CSVs in fixed-size chunks and accumulate their PartialAggregates.
+    Peak memory is bounded by the chunk size rather than the total number of rows.
+    """
+    aggregates = PartialAggregates(key_fields, bd_slrn, bdslrn_len, meter_slrn, mslrn_len, plan=plan, memo=memo)
+
+    for path in paths:
+        for chunk in read_extract(path, slrn_prefix, chunksize=chunksize):
+            aggregates.update(chunk)
+
+    return aggregates
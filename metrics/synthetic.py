@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from metrics.loader import prepare_extract
+
+# Identifier formats of each utility's CAIMS extract
+UTILITIES = {
+    'ECG': {'slrn_prefix': 'ECGBD', 'slrn_length': 12, 'meter_prefix': 'ECGCR', 'meter_length': 11, 'country_code': '233', 'phone_digits': 9},
+    'AEDC': {'slrn_prefix': 'AEDCBD', 'slrn_length': 13, 'meter_prefix': 'AEDCCR', 'meter_length': 12, 'country_code': '234', 'phone_digits': 10},
+    'YEDC': {'slrn_prefix': 'YEDCBD', 'slrn_length': 13, 'meter_prefix': 'YEDCCR', 'meter_length': 12, 'country_code': '234', 'phone_digits': 10}
+}
+
+# Share of rows drawn from each variant of a column; the rest are well formed
+RATES = {
+    'SLRN': {'null': 0.01, 'bad length': 0.02},
+    'Account Number': {'null': 0.15, 'short': 0.05},
+    'Meter Number': {'null': 0.05, 'scientific': 0.08, 'alphanumeric': 0.10, 'short': 0.02},
+    'Meter SLRN': {'null': 0.10, 'short': 0.03},
+    'Meter Status': {'null': 0.02, 'Unmetered': 0.13},
+    'Phone Number': {'null': 0.10, 'international': 0.20, 'plus': 0.05, 'malformed': 0.05},
+    'Email': {'null': 0.45, 'placeholder': 0.15, 'malformed': 0.05},
+    'First Captured Username': {'null': 0.01},
+    'Updated Username': {'null': 0.60},
+    'is_on_board': {'Direct Connection': 0.05, 'No': 0.05}
+}
+
+def make_extract(n, utility='ECG', seed=0, start='2023-01', months=12, collectors=200):
+    """
+    A raw CAIMS customer extract of n rows for utility ('ECG', 'AEDC' or 'YEDC'),
+    with the raw column names and text identifiers read_extract produces. Columns
+    contain blanks, wrongly sized SLRNs, meter numbers in scientific notation,
+    placeholder emails such as 'noemail@...' and malformed phone numbers at the
+    RATES above. Dates are spread over months months from start.
+    """
+    formats = UTILITIES[utility]
+    rng = np.random.default_rng(seed)
+
+    def digits(count, width):
+        return pd.Series(rng.integers(10 ** (width - 1), 10 ** width, count)).astype(str).to_numpy(dtype=object)
+
+    def variants(column, values):
+        # values maps each variant (and 'valid') to n candidate values
+        rates = RATES[column]
+        choice = rng.choice(len(rates) + 1, n, p=[1 - sum(rates.values())] + list(rates.values()))
+        result = np.array(values['valid'], dtype=object)
+        for number, variant in enumerate(rates, start=1):
+            picked = choice == number
+            result[picked] = np.nan if variant == 'null' else np.asarray(values[variant], dtype=object)[picked]
+        return result
+
+    slrn_digits = formats['slrn_length'] - len(formats['slrn_prefix'])
+    meter_digits = formats['meter_length'] - len(formats['meter_prefix'])
+    phone_digits = formats['phone_digits']
+
+    meter_numbers = digits(n, 11)
+    scientific = pd.Series(meter_numbers).astype(float).map('{:.5E}'.format).to_numpy(dtype=object)
+    letters = np.array(list('ABCDEFGHJKLMNPRSTUVWXYZ'), dtype=object)
+    usernames = np.array([f'{utility.lower()}.collector{number:04d}' for number in range(collectors)], dtype=object)
+    # A few collectors capture most of the records
+    collector_weights = 1 / np.arange(1, collectors + 1)
+    local_numbers = digits(n, phone_digits)
+    emails = np.char.add(np.char.add('customer', digits(n, 6).astype(str)), rng.choice(['@gmail.com', '@yahoo.com', '@outlook.com'], n)).astype(object)
+
+    extract = pd.DataFrame({
+        'slrn': variants('SLRN', {
+            'valid': formats['slrn_prefix'] + digits(n, slrn_digits),
+            'bad length': formats['slrn_prefix'] + digits(n, slrn_digits - 1)
+        }),
+        'ac_no': variants('Account Number', {'valid': digits(n, 8), 'short': digits(n, 3)}),
+        'meter_number': variants('Meter Number', {
+            'valid': meter_numbers,
+            'scientific': scientific,
+            'alphanumeric': letters[rng.integers(0, len(letters), n)] + letters[rng.integers(0, len(letters), n)] + digits(n, 8),
+            'short': digits(n, 4)
+        }),
+        'meter_status': variants('Meter Status', {'valid': np.full(n, 'Metered', dtype=object), 'Unmetered': np.full(n, 'Unmetered', dtype=object)}),
+        'meter_slrn': variants('Meter SLRN', {
+            'valid': formats['meter_prefix'] + digits(n, meter_digits),
+            'short': formats['meter_prefix'] + digits(n, 3)
+        }),
+        'phone_number': variants('Phone Number', {
+            'valid': '0' + local_numbers,
+            'international': formats['country_code'] + local_numbers,
+            'plus': '+' + formats['country_code'] + local_numbers,
+            'malformed': rng.choice(np.array(['0', '12345', 'N/A', '0000000'], dtype=object), n) + digits(n, 2)
+        }),
+        'email': variants('Email', {
+            'valid': emails,
+            'placeholder': rng.choice(np.array(['noemail@gmail.com', 'nomail@yahoo.com', 'nil@nil.com', 'NIL', 'customer@example.com'], dtype=object), n),
+            'malformed': rng.choice(np.array(['customer@', 'customer.gmail.com', ' ', 'n/a'], dtype=object), n)
+        }),
+        'date': (pd.Period(start, 'M').start_time + pd.to_timedelta(rng.integers(0, 30 * months, n), unit='D')).strftime('%Y-%m-%d'),
+        'first_captured_username': variants('First Captured Username', {'valid': rng.choice(usernames, n, p=collector_weights / collector_weights.sum())}),
+        'updated_username': variants('Updated Username', {'valid': rng.choice(usernames, n)}),
+        'is_on_board': variants('is_on_board', {
+            'valid': np.full(n, 'Yes', dtype=object),
+            'Direct Connection': np.full(n, 'Direct Connection', dtype=object),
+            'No': np.full(n, 'No', dtype=object)
+        })
+    })
+
+    return extract
+
+def make_customers(n, utility='ECG', seed=0, **options):
+    """
+    A prepared customer frame built from make_extract, as the metrics functions
+    expect it. Direct connections are dropped, so it has somewhat fewer than n rows.
+    """
+    return prepare_extract(make_extract(n, utility, seed, **options))
+
+def write_extract(path, n, utility='ECG', seed=0, chunksize=1000000, **options):
+    """
+    Write a make_extract CSV of n rows, generated chunksize rows at a time so
+    extracts of tens of millions of rows fit in memory.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(-(-n // chunksize))
+    for number, chunk_seed in enumerate(seeds):
+        rows = min(chunksize, n - number * chunksize)
+        make_extract(rows, utility, chunk_seed, **options).to_csv(path, mode='w' if number == 0 else 'a', header=number == 0, index=False)
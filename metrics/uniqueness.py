@@ -0,0 +1,84 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from metrics.dataquality import UNIQUENESS_FIELDS, RuleMaskCache, hash_identifiers
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS identifiers (field TEXT, hash INTEGER, count INTEGER, PRIMARY KEY (field, hash)) WITHOUT ROWID;
+"""
+
+class UniquenessIndex:
+    """
+    How often each normalized identifier of the UNIQUENESS_FIELDS occurs across
+    every batch of records added so far, kept by 64-bit hash in a local SQLite
+    database (in memory if path is None). Batches are added once per source name,
+    such as a month or an extract file, so scoring a new month is one pass over
+    that month's records instead of a sort of the whole history.
+    """
+
+    def __init__(self, path=None):
+        self.connection = sqlite3.connect(path or ':memory:')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def add(self, df, source, cache=None):
+        """
+        Count the identifiers of df under source. Returns False, without counting
+        anything, if source was already added.
+        """
+        if self.has_source(source):
+            return False
+        if cache is None:
+            cache = RuleMaskCache(df)
+
+        with self.connection:
+            self.connection.execute('INSERT INTO sources (source) VALUES (?)', (source,))
+            for field_name in UNIQUENESS_FIELDS:
+                if field_name not in df.columns:
+                    continue
+                hashes, counts = np.unique(hash_identifiers(cache.processed(field_name)), return_counts=True)
+                self.connection.executemany(
+                    'INSERT INTO identifiers (field, hash, count) VALUES (?, ?, ?) ON CONFLICT (field, hash) DO UPDATE SET count = count + excluded.count',
+                    zip([field_name] * len(hashes), hashes.tolist(), counts.tolist())
+                )
+
+        return True
+
+    def has_source(self, source):
+        return self.connection.execute('SELECT 1 FROM sources WHERE source = ?', (source,)).fetchone() is not None
+
+    def sources(self):
+        return [source for (source,) in self.connection.execute('SELECT source FROM sources ORDER BY rowid')]
+
+    def counts(self, field_name, hashes):
+        """
+        The number of records added with each of the given identifier hashes
+        (0 for hashes never added), as an array aligned with hashes.
+        """
+        unique_hashes = np.unique(hashes)
+
+        self.connection.execute('CREATE TEMP TABLE IF NOT EXISTS lookup (hash INTEGER PRIMARY KEY)')
+        self.connection.execute('DELETE FROM lookup')
+        self.connection.executemany('INSERT INTO lookup (hash) VALUES (?)', zip(unique_hashes.tolist()))
+        rows = self.connection.execute(
+            'SELECT identifiers.hash, identifiers.count FROM lookup JOIN identifiers ON identifiers.hash = lookup.hash AND identifiers.field = ?',
+            (field_name,)
+        ).fetchall()
+        self.connection.execute('DELETE FROM lookup')
+
+        found = pd.Series(dict(rows), dtype='int64')
+        return found.reindex(hashes, fill_value=0).to_numpy()
+
+    def duplicates(self, field_name):
+        """
+        The number of distinct identifiers of a field that occur more than once, and
+        the number of records carrying them.
+        """
+        return self.connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(count), 0) FROM identifiers WHERE field = ? AND count > 1', (field_name,)
+        ).fetchone()